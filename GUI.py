@@ -1,12 +1,16 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
-import pandas as pd
 from pathlib import Path
-from executor import TestExecutor
 from logger import HTMLReportGenerator
-from utils import load_translation_table, generate_code_from_testcase
+from utils import load_translation_table, load_testcase, step_command
 from config.settings import DEFAULT_TESTCASE_PATH, TRANSLATION_TABLE_PATH
 import os  # Import the os module
+import queue
+import threading
+import time
+
+# How often (ms) the Tk loop drains events posted by the execution worker
+POLL_INTERVAL_MS = 100
 
 class TestCaseGenerator:
     def __init__(self, root):
@@ -27,6 +31,17 @@ class TestCaseGenerator:
         self.test_case_file = None
         self.translation_table = load_translation_table(TRANSLATION_TABLE_PATH)
 
+        # Background execution state
+        self.run_queue = []  # workbooks waiting to run after the current test case
+        self.events = queue.Queue()  # worker -> Tk thread messages
+        self.stop_event = threading.Event()
+        self.resume_event = threading.Event()
+        self.worker = None
+        self.step_rows = []  # listbox row of each executed step
+        self.step_times = []
+        self.job_number = self.job_count = 0
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
         # Create header frame
         self._create_header()
 
@@ -176,7 +191,10 @@ class TestCaseGenerator:
             ("Remove Selected", self._remove_step),
             ("Generate Test Case", self._generate_test_case),
             ("Import Test Cases", self._import_test_cases),
-            ("Execute Test", self._execute_test)
+            ("Queue Workbooks", self._queue_workbooks),
+            ("Execute Test", self._execute_test),
+            ("Pause", self._toggle_pause),
+            ("Stop", self._stop_execution)
         ]
 
         for text, command in buttons:
@@ -191,6 +209,27 @@ class TestCaseGenerator:
             if text == "Execute Test":
                 self.execute_button = btn
                 btn.config(state=tk.DISABLED)
+            elif text == "Pause":
+                self.pause_button = btn
+                btn.config(state=tk.DISABLED)
+            elif text == "Stop":
+                self.stop_button = btn
+                btn.config(state=tk.DISABLED)
+
+        # Progress of the running test case
+        progress_frame = tk.Frame(main_frame, bg=self.bg_color)
+        progress_frame.pack(fill=tk.X, pady=5)
+
+        self.progress = ttk.Progressbar(progress_frame, mode="determinate", length=300)
+        self.progress.pack(side=tk.LEFT)
+
+        self.status_label = tk.Label(
+            progress_frame,
+            text="Idle",
+            bg=self.bg_color,
+            font=("Helvetica", 9)
+        )
+        self.status_label.pack(side=tk.LEFT, padx=10)
 
     def _update_input_fields(self, *args):
         """Update input fields based on selected command"""
@@ -275,6 +314,8 @@ class TestCaseGenerator:
             messagebox.showwarning("Input Error", "Please enter a test case name")
             return
 
+        import pandas as pd
+
         # Create DataFrame with steps
         df = pd.DataFrame([
             {'Step': idx+1, **step}
@@ -301,49 +342,191 @@ class TestCaseGenerator:
             return
 
         try:
-            df = pd.read_excel(file_path)
-            self.test_cases = df.to_dict('records')
-
-            # Update UI
-            self.steps_listbox.delete(0, tk.END)
-            for step in self.test_cases:
-                step_desc = f"{step['Command']}: {step.get('Locator', '')} {step.get('Value', '')}".strip()
-                self.steps_listbox.insert(tk.END, step_desc)
-
-            self.test_case_file = Path(file_path)
-            self.test_case_name_entry.delete(0, tk.END)
-            self.test_case_name_entry.insert(0, self.test_case_file.stem)
-            self.execute_button.config(state=tk.NORMAL)
-
+            self._show_test_case(Path(file_path), load_testcase(file_path).to_dict('records'))
             messagebox.showinfo("Success", "Test cases imported successfully")
         except Exception as e:
             messagebox.showerror("Import Error", f"Failed to import test cases: {str(e)}")
 
+    def _show_test_case(self, path, test_cases):
+        """Make a loaded workbook the current test case"""
+        self.test_cases = test_cases
+
+        # Update UI
+        self.steps_listbox.delete(0, tk.END)
+        for step in self.test_cases:
+            step_desc = f"{step['Command']}: {step.get('Locator', '')} {step.get('Value', '')}".strip()
+            self.steps_listbox.insert(tk.END, step_desc)
+
+        self.test_case_file = path
+        self.test_case_name_entry.delete(0, tk.END)
+        self.test_case_name_entry.insert(0, self.test_case_file.stem)
+        self.execute_button.config(state=tk.NORMAL)
+
+    def _queue_workbooks(self):
+        """Add workbooks to run one after another once the current test case finishes"""
+        file_paths = filedialog.askopenfilenames(
+            title="Select Test Case Files to Queue",
+            filetypes=[("Excel Files", "*.xlsx")]
+        )
+        if not file_paths:
+            return
+
+        self.run_queue.extend(Path(p) for p in file_paths)
+        self.execute_button.config(state=tk.NORMAL)
+        if not self._is_running():
+            self.status_label.config(text=f"{len(self.run_queue)} workbook(s) queued")
+
     def _execute_test(self):
-        """Execute the current test case"""
-        if not self.test_case_file:
+        """Execute the current test case and any queued workbooks in the background"""
+        if self._is_running():
+            return
+        if not self.test_case_file and not self.run_queue:
             messagebox.showwarning("Execution Error", "No test case file loaded")
             return
 
+        # Each job is (path, steps); queued workbooks are loaded by the worker
+        jobs = []
+        if self.test_case_file:
+            jobs.append((self.test_case_file, list(self.test_cases)))
+        jobs.extend((path, None) for path in self.run_queue)
+        self.run_queue = []
+
+        self.stop_event.clear()
+        self.resume_event.set()
+        self.worker = threading.Thread(target=self._run_jobs, args=(jobs,), daemon=True)
+        self._set_running(True)
+        self.worker.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def _run_jobs(self, jobs):
+        """Worker thread: run each job's steps and post progress to self.events"""
+        # pandas and selenium are only imported once a test actually runs
+        import pandas as pd
+        from executor import TestExecutor
+        from compiler import compile_testcase
+
+        executor = None
+        reports = []
         try:
             # Create test executor
             executor = TestExecutor()
 
-            # Generate and execute script
-            df = pd.DataFrame(self.test_cases)
-            script_lines = generate_code_from_testcase(df, self.translation_table)
-            results = executor.execute_script(script_lines)
-
-            # Generate report
-            HTMLReportGenerator.generate_report(script_lines, results)
-            messagebox.showinfo("Execution Complete", "Test execution finished. Report generated.")
-
+            for number, (path, test_cases) in enumerate(jobs, 1):
+                if self.stop_event.is_set():
+                    break
+                if test_cases is None:
+                    test_cases = load_testcase(path).to_dict('records')
+                    self.events.put(('load', path, test_cases))
+
+                # Generate and execute script
+                df = pd.DataFrame(test_cases).fillna('')
+                plan = compile_testcase(df, self.translation_table)
+                rows = [i for i, step in enumerate(test_cases)
+                        if self.translation_table.get(step_command(step))]
+                self.events.put(('start', number, len(jobs), len(plan), rows))
+
+                lines, results = [], []
+                steps = executor.iter_plan(plan)
+                for step, result in steps:
+                    lines.append(step.line)
+                    results.append(result)
+                    self.events.put(('step', len(results) - 1, result.passed, result.wall_time))
+
+                    self.resume_event.wait()
+                    if self.stop_event.is_set():
+                        steps.close()
+                        break
+
+                # Generate report
+                if results:
+                    reports.append(HTMLReportGenerator.generate_report(lines, results))
+
+            self.events.put(('done', len(reports), self.stop_event.is_set()))
         except Exception as e:
-            messagebox.showerror("Execution Error", f"Test execution failed: {str(e)}")
+            self.events.put(('error', str(e)))
         finally:
-            if hasattr(executor, 'close') and callable(executor.close):
+            if executor:
                 executor.close()
 
+    def _poll_events(self):
+        """Apply worker events to the widgets; runs on the Tk thread"""
+        try:
+            while True:
+                event = self.events.get_nowait()
+                kind = event[0]
+                if kind == 'load':
+                    self._show_test_case(event[1], event[2])
+                elif kind == 'start':
+                    _, self.job_number, self.job_count, total, self.step_rows = event
+                    self.step_times = []
+                    self.progress.config(maximum=max(total, 1), value=0)
+                    for row in range(self.steps_listbox.size()):
+                        self.steps_listbox.itemconfig(row, bg="white")
+                elif kind == 'step':
+                    _, index, passed, wall_time = event
+                    self._show_step_result(index, passed, wall_time)
+                elif kind == 'done':
+                    self._set_running(False)
+                    state = "stopped" if event[2] else "finished"
+                    self.status_label.config(text=f"Execution {state}")
+                    messagebox.showinfo("Execution Complete",
+                                        f"Test execution {state}. {event[1]} report(s) generated.")
+                    return
+                elif kind == 'error':
+                    self._set_running(False)
+                    self.status_label.config(text="Execution failed")
+                    messagebox.showerror("Execution Error", f"Test execution failed: {event[1]}")
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def _show_step_result(self, index, passed, wall_time):
+        """Colour the step's listbox row and update the progress bar and ETA"""
+        if index < len(self.step_rows):
+            row = self.step_rows[index]
+            self.steps_listbox.itemconfig(row, bg="#e8f5e9" if passed else "#ffebee")
+            self.steps_listbox.see(row)
+
+        self.step_times.append(wall_time)
+        done = index + 1
+        total = int(self.progress.cget('maximum'))
+        self.progress.config(value=done)
+        remaining = (total - done) * sum(self.step_times) / len(self.step_times)
+        eta = time.strftime('%H:%M:%S', time.gmtime(remaining))
+        self.status_label.config(
+            text=f"Workbook {self.job_number}/{self.job_count} | Step {done}/{total} | ETA {eta}")
+
+    def _toggle_pause(self):
+        """Pause or resume the worker between steps"""
+        if self.resume_event.is_set():
+            self.resume_event.clear()
+            self.pause_button.config(text="Resume")
+        else:
+            self.resume_event.set()
+            self.pause_button.config(text="Pause")
+
+    def _stop_execution(self):
+        """Ask the worker to stop after the current step"""
+        self.stop_event.set()
+        self.resume_event.set()
+        self.status_label.config(text="Stopping...")
+
+    def _is_running(self):
+        return self.worker is not None and self.worker.is_alive()
+
+    def _set_running(self, running):
+        self.execute_button.config(state=tk.DISABLED if running else tk.NORMAL)
+        self.pause_button.config(state=tk.NORMAL if running else tk.DISABLED, text="Pause")
+        self.stop_button.config(state=tk.NORMAL if running else tk.DISABLED)
+
+    def _on_close(self):
+        """Stop a running execution so its browser is closed, then quit"""
+        if self._is_running():
+            self._stop_execution()
+            self.worker.join(timeout=5)
+        self.root.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
 
@@ -0,0 +1,152 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from config.settings import (ARTIFACTS_DIR, CAPTURE_ARTIFACTS, ARTIFACTS_COMPRESS,
+                             ARTIFACTS_MAX_BYTES, ARTIFACTS_MAX_AGE_DAYS, ARTIFACT_QUEUE_SIZE)
+from profiling import StepHook
+
+class ArtifactStore:
+    """Content-addressed artifact files written by a background thread.
+
+    put() hashes the content and returns its path relative to ARTIFACTS_DIR
+    straight away; compression and the disk write happen on the writer
+    thread. Content already stored is not written again, only marked as
+    recently used for eviction.
+    """
+    def __init__(self, root=None, compress=None, queue_size=None):
+        self.root = root or ARTIFACTS_DIR
+        self.compress = ARTIFACTS_COMPRESS if compress is None else compress
+        # Bounded, so a run capturing every step can't outpace the disk without limit
+        self.pending = queue.Queue(maxsize=queue_size or ARTIFACT_QUEUE_SIZE)
+        self.errors = []
+        self._thread = None
+
+    def put(self, data, extension, compressible=True):
+        """Queue bytes for writing and return the relative path they will have"""
+        digest = hashlib.sha256(data).hexdigest()
+        compress = self.compress and compressible
+        relative = f"{digest[:2]}/{digest}.{extension}" + (".gz" if compress else "")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+            self._thread.start()
+        self.pending.put((relative, data, compress))
+        return relative
+
+    def _write_loop(self):
+        while True:
+            item = self.pending.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except OSError as e:
+                self.errors.append(str(e))
+            finally:
+                self.pending.task_done()
+
+    def _write(self, relative, data, compress):
+        path = self.root / relative
+        if path.exists():
+            os.utime(path)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if compress:
+            data = gzip.compress(data, compresslevel=6)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Wait for queued writes to finish and stop the writer thread"""
+        if self._thread is not None:
+            self.pending.put(None)
+            self._thread.join()
+            self._thread = None
+
+def evict(root=None, max_bytes=None, max_age_days=None):
+    """Delete artifacts older than max_age_days, then the least recently used past max_bytes"""
+    root = root or ARTIFACTS_DIR
+    max_bytes = ARTIFACTS_MAX_BYTES if max_bytes is None else max_bytes
+    max_age_days = ARTIFACTS_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    if not root.exists():
+        return 0
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    entries = []
+    removed = 0
+    for path in root.glob("*/*"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if cutoff and stat.st_mtime < cutoff:
+            removed += _unlink(path)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if not max_bytes or total <= max_bytes:
+            break
+        removed += _unlink(path)
+        total -= size
+    return removed
+
+def _unlink(path):
+    try:
+        path.unlink()
+        return 1
+    except OSError:
+        return 0
+
+class ArtifactCapture(StepHook):
+    """Captures screenshot, page source and console log after failed (or all) steps.
+
+    Only the driver calls run on the executor thread; the result's artifacts
+    attribute gets the relative paths, which the HTML report links to.
+    """
+    def __init__(self, mode=None, store=None):
+        self.mode = mode or CAPTURE_ARTIFACTS
+        self.store = store or ArtifactStore()
+        self.driver = None
+
+    def attach(self, driver):
+        self.driver = driver
+
+    def after_step(self, index, step, result):
+        if self.mode == "off" or (self.mode == "failures" and result.passed):
+            return
+        if self.driver is None:
+            return
+        result.artifacts = self.capture()
+
+    def capture(self):
+        artifacts = {}
+        try:
+            # Base64 as sent by the driver: decoding and hashing are cheap, the browser did the encoding
+            png = base64.b64decode(self.driver.get_screenshot_as_base64())
+            artifacts['screenshot'] = self.store.put(png, 'png', compressible=False)
+        except Exception:
+            pass  # E.g. an alert is open, or the session died with the failure
+        try:
+            # Uncompressed: browsers download a linked .html.gz instead of showing it
+            artifacts['source'] = self.store.put(self.driver.page_source.encode('utf-8'), 'html',
+                                                 compressible=False)
+        except Exception:
+            pass
+        try:
+            # Only Chromium drivers expose the browser log
+            entries = self.driver.get_log('browser')
+            artifacts['console'] = self.store.put(json.dumps(entries, indent=1).encode('utf-8'), 'json')
+        except Exception:
+            pass
+        return artifacts
+
+    def close(self):
+        self.store.close()
+        evict(self.store.root)
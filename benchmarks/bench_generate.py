@@ -0,0 +1,47 @@
+"""Compare generate_code_from_testcase with generate_code_vectorized.
+
+Run from the project root:
+    python -m benchmarks.bench_generate [rows ...]
+"""
+import argparse
+import time
+import pandas as pd
+from utils import (load_translation_table, load_testcase, generate_code_from_testcase,
+                   generate_code_vectorized)
+
+def synthetic_testcase(rows, seed_df):
+    """Repeat the steps of a real workbook until the frame has the requested rows"""
+    repeats = -(-rows // len(seed_df))
+    df = pd.concat([seed_df] * repeats, ignore_index=True).iloc[:rows].copy()
+    df['Step'] = range(1, rows + 1)
+    return df
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=int, default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    translation_table = load_translation_table()
+    seed_df = load_testcase()
+    print(f"{'rows':>8} {'iterrows (s)':>14} {'vectorized (s)':>16} {'speedup':>9}")
+    for rows in args.rows:
+        df = synthetic_testcase(rows, seed_df)
+        expected = generate_code_from_testcase(df, translation_table)
+        if generate_code_vectorized(df, translation_table) != expected:
+            raise AssertionError(f"Vectorized output differs at {rows} rows")
+
+        baseline = best_of(lambda: generate_code_from_testcase(df, translation_table), args.repeat)
+        vectorized = best_of(lambda: generate_code_vectorized(df, translation_table), args.repeat)
+        print(f"{rows:>8} {baseline:>14.3f} {vectorized:>16.3f} {baseline / vectorized:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Time each stage of a test run on a synthetic workbook, without network or browser.
+
+Run from the project root:
+    python -m benchmarks.bench_stages --cases 50 --steps 40
+    python -m benchmarks.bench_stages --save-baseline benchmarks/baselines/local.json
+    python -m benchmarks.bench_stages --baseline benchmarks/baselines/local.json
+
+Execution uses the fake driver, so the timings are the framework's own
+overhead; --browser adds a run against the local fixture site in a real
+browser. With --baseline the exit status is 1 when a stage got slower than
+the baseline by more than --threshold.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.fixture_site import fake_driver, serve
+from benchmarks.workbooks import write_workbook
+from compiler import compile_testcase
+from config.settings import BASE_DIR
+from executor import TestExecutor
+from logger import HTMLReportGenerator
+from utils import load_translation_table, load_testcase, generate_code_from_testcase
+from waits import WaitPolicy
+
+THRESHOLD = 0.25  # allowed slowdown against the baseline, as a fraction
+MIN_DELTA = 0.002  # seconds; smaller differences are noise whatever the ratio
+
+def timed(func, repeat):
+    """Wall times of repeat calls of func"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+@contextlib.contextmanager
+def quiet():
+    # The executor prints every step; the console would dominate the timings
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def _executor(driver=None, **options):
+    # No latency history: benchmarks must not train the waits of real runs
+    return TestExecutor(driver=driver, wait_policy=WaitPolicy(), **options)
+
+def _check_passed(outcomes, stage):
+    failed = [outcome for outcome in outcomes if outcome != "PASS"]
+    if failed:
+        raise SystemExit(f"{stage}: {len(failed)} steps failed, e.g. {failed[0]}")
+
+def import_times(module, repeat):
+    """Seconds a fresh interpreter spends importing module, startup itself subtracted"""
+    def run(source):
+        return lambda: subprocess.run([sys.executable, "-c", source], cwd=BASE_DIR, check=True)
+    startup = min(timed(run("pass"), repeat))
+    return [max(seconds - startup, 0.0) for seconds in timed(run(f"import {module}"), repeat)]
+
+def run_stages(cases, steps, repeat, browser=None):
+    """{stage: {'median', 'best'}} in seconds"""
+    with tempfile.TemporaryDirectory(prefix="bugzero_bench_") as workdir:
+        return _run_stages(Path(workdir), cases, steps, repeat, browser)
+
+def _run_stages(workdir, cases, steps, repeat, browser):
+    results = {}
+    workbook = write_workbook(workdir / "synthetic.xlsx", cases, steps)
+
+    def record(stage, func=None, timings=None):
+        timings = timings or timed(func, repeat)
+        median, best = statistics.median(timings), min(timings)
+        results[stage] = {'median': round(median, 6), 'best': round(best, 6)}
+        print(f"{stage:<34} {median * 1000:10.2f} ms  (best {best * 1000:.2f} ms)", flush=True)
+
+    record("load_translation_table (parse)", lambda: load_translation_table(cache=False))
+    load_translation_table()
+    record("load_translation_table (cached)", load_translation_table)
+    record("load_testcase (parse)", lambda: load_testcase(workbook, cache=False))
+    load_testcase(workbook)
+    record("load_testcase (cached)", lambda: load_testcase(workbook))
+
+    translation_table = load_translation_table()
+    df = load_testcase(workbook)
+    record("generate_code_from_testcase", lambda: generate_code_from_testcase(df, translation_table))
+    record("compile_testcase", lambda: compile_testcase(df, translation_table))
+
+    script_lines = generate_code_from_testcase(df, translation_table)
+    executor = _executor(fake_driver())
+    try:
+        with quiet():
+            _check_passed(executor.execute_script(script_lines), "execute_script")
+            timings = timed(lambda: executor.execute_script(script_lines), repeat)
+            results_list = executor.execute_steps(compile_testcase(df, translation_table))
+    finally:
+        executor.close()
+    record("execute_script (fake driver)", timings=timings)
+    record("HTMLReportGenerator", lambda: HTMLReportGenerator._build_html(script_lines, results_list))
+
+    record("GUI import", timings=import_times("GUI", repeat))
+
+    if browser:
+        with serve() as base_url:
+            live_workbook = write_workbook(workdir / "live.xlsx", cases, steps, base_url)
+            live_lines = generate_code_from_testcase(load_testcase(live_workbook), translation_table)
+            executor = _executor(browser=browser, profile="fast")
+            try:
+                with quiet():
+                    _check_passed(executor.execute_script(live_lines), "execute_script (browser)")
+                    timings = timed(lambda: executor.execute_script(live_lines), repeat)
+            finally:
+                executor.close()
+            record(f"execute_script ({browser})", timings=timings)
+    return results
+
+def compare(results, baseline, threshold):
+    """Stages slower than the baseline by more than threshold, as (stage, baseline, current)"""
+    regressions = []
+    for stage, timing in results.items():
+        before = baseline['stages'].get(stage)
+        if before is None:
+            continue
+        current, previous = timing['median'], before['median']
+        change = (current - previous) / previous if previous else 0.0
+        flag = ""
+        if change > threshold and current - previous > MIN_DELTA:
+            regressions.append((stage, previous, current))
+            flag = "  REGRESSION"
+        print(f"{stage:<34} {previous * 1000:10.2f} -> {current * 1000:10.2f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=25, help="steps per test case")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--browser", help="also run against the fixture site in this browser (chrome, firefox, edge)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the timings as a JSON baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown per stage, e.g. 0.25 for 25%%")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if (baseline['cases'], baseline['steps']) != (args.cases, args.steps):
+            raise SystemExit(f"Baseline was taken with --cases {baseline['cases']} --steps {baseline['steps']}")
+
+    print(f"{args.cases} test cases x {args.steps} steps, median of {args.repeat}")
+    results = run_stages(args.cases, args.steps, args.repeat, args.browser)
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'cases': args.cases, 'steps': args.steps, 'repeat': args.repeat,
+                       'python': platform.python_version(), 'machine': platform.node(),
+                       'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'stages': results}, f, indent=2)
+        print(f"Baseline written to {path}")
+
+    if baseline:
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Local stand-ins for the pages the example workbooks target.
+
+serve() runs them on 127.0.0.1 for benchmarks with a real browser, and
+fake_driver() returns a FakeDriver whose titles and element texts mirror
+them, for benchmarks without one. ELEMENTS lists what synthetic workbooks
+may use on each page.
+"""
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fake_driver import FakeDriver
+from locators import locator_strategy
+
+OFFLINE_URL = "http://fixture.invalid"
+SORT_OPTIONS = [("az", "Name (A to Z)"), ("za", "Name (Z to A)"), ("lohi", "Price (low to high)")]
+
+PAGES = {
+    "/": ("Swag Labs", """
+<form onsubmit="return false;">
+  <input id="user-name" name="user-name" data-test="username" placeholder="Username">
+  <input id="password" name="password" type="password" data-test="password" placeholder="Password">
+  <input id="login-button" type="submit" data-test="login-button" value="Login">
+</form>
+<h4 class="login-title">Accepted usernames are:</h4>
+"""),
+    "/inventory.html": ("Swag Labs", """
+<div id="header">
+  <a id="logout_sidebar_link" href="/">Logout</a>
+  <a class="shopping_cart_link" href="/cart.html"><span class="shopping_cart_badge" data-test="shopping-cart-badge">2</span></a>
+  <select class="product_sort_container" data-test="product-sort-container">
+    """ + "".join(f'<option value="{value}">{label}</option>' for value, label in SORT_OPTIONS) + """
+  </select>
+</div>
+<div class="inventory_list">
+  <div class="inventory_item">
+    <div class="inventory_item_name" data-test="inventory-item-name">Sauce Labs Backpack</div>
+    <button id="add-to-cart-sauce-labs-backpack" name="add-to-cart-sauce-labs-backpack">Add to cart</button>
+  </div>
+  <div class="inventory_item">
+    <div class="inventory_item_name" data-test="inventory-item-name">Sauce Labs Bike Light</div>
+    <button id="add-to-cart-sauce-labs-bike-light" name="add-to-cart-sauce-labs-bike-light">Add to cart</button>
+  </div>
+</div>
+"""),
+    "/youtube": ("YouTube", """
+<div id="center">
+  <yt-searchbox>
+    <div><form onsubmit="return false;"><input name="search_query" placeholder="Search"></form></div>
+    <button aria-label="Search">Search</button>
+  </yt-searchbox>
+</div>
+<h1 id="video-title">Selenium WebDriver</h1>
+"""),
+}
+
+# (page, kind, locator, text): inputs take InputText, buttons Click, texts AssertText, selects
+# an option value, pointer elements Hover/DoubleClick/RightClick and drag sources the XPath of
+# their drop target. Locators mix prefixes, XPaths the optimizer rewrites and ones it leaves alone
+ELEMENTS = [
+    ("/", "input", "id=user-name", ""),
+    ("/", "input", "//*[@id='password']", ""),
+    ("/", "text", "//h4[contains(@class, 'login-title')]", "Accepted usernames are:"),
+    ("/", "button", "//input[@data-test='login-button']", ""),
+    ("/inventory.html", "button", "id=add-to-cart-sauce-labs-backpack", ""),
+    ("/inventory.html", "button", "//*[@id='add-to-cart-sauce-labs-bike-light']", ""),
+    ("/inventory.html", "text", "//span[@class='shopping_cart_badge' and @data-test='shopping-cart-badge']", "2"),
+    ("/inventory.html", "text", "(//div[@data-test='inventory-item-name'])[1]", "Sauce Labs Backpack"),
+    ("/inventory.html", "text", "css=#logout_sidebar_link", "Logout"),
+    ("/inventory.html", "select", "//select[@data-test='product-sort-container']", "za"),
+    ("/inventory.html", "pointer", "//*[@id='add-to-cart-sauce-labs-bike-light']", ""),
+    ("/inventory.html", "drag", "css=.inventory_item_name", "//a[@class='shopping_cart_link']"),
+    ("/youtube", "input", "//*[@id='center']/yt-searchbox/div[1]/form/input", ""),
+    ("/youtube", "button", "//*[@id='center']/yt-searchbox/button", ""),
+    ("/youtube", "text", "name=search_query", ""),
+    ("/youtube", "text", "//h1[@id='video-title']", "Selenium WebDriver"),
+    ("/youtube", "pointer", "//h1[@id='video-title']", ""),
+]
+
+def page_html(path):
+    title, body = PAGES[path]
+    return f"<!DOCTYPE html><html><head><title>{title}</title></head><body>{body}</body></html>"
+
+def fake_driver(base_url=OFFLINE_URL):
+    """A FakeDriver answering titles, element texts and selects like the fixture pages"""
+    titles = {base_url + path: title for path, (title, _) in PAGES.items()}
+    # Keyed by the selector a step looks up, i.e. after its strategy is applied
+    texts = {locator_strategy(locator)[1]: text for _, kind, locator, text in ELEMENTS if kind == "text"}
+    selects = {locator_strategy(locator)[1]: SORT_OPTIONS for _, kind, locator, _ in ELEMENTS if kind == "select"}
+    return FakeDriver(titles=titles, texts=texts, selects=selects)
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path not in PAGES:
+            self.send_error(404)
+            return
+        payload = page_html(path).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@contextmanager
+def serve(port=0):
+    """Serve the fixture pages on 127.0.0.1 and yield the base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,77 @@
+"""Synthetic test case workbooks of configurable size against the fixture site.
+
+Run from the project root:
+    python -m benchmarks.workbooks out.xlsx --cases 100 --steps 50
+"""
+import argparse
+import itertools
+from collections import Counter
+import pandas as pd
+from benchmarks.fixture_site import OFFLINE_URL, PAGES, ELEMENTS, SORT_OPTIONS
+
+# Commands per element kind, taken in turn as the element comes round again
+COMMANDS = {
+    "input": ("InputText",),
+    "button": ("Click",),
+    "text": ("AssertText",),
+    "select": ("SelectByValue", "SelectByVisible"),
+    "pointer": ("Hover", "DoubleClick", "RightClick"),
+    "drag": ("DragAndDrop",),
+}
+
+def synthetic_rows(cases, steps, base_url=OFFLINE_URL):
+    """Rows of `cases` test cases of `steps` steps each.
+
+    Every case opens one of the fixture pages and cycles through its
+    elements, with an AssertTitle now and then. The same arguments always
+    give the same rows, and every step passes against the fixture site.
+    """
+    rows = []
+    turns = Counter()
+    pages = itertools.cycle(PAGES)
+    for case in range(cases):
+        path = next(pages)
+        title = PAGES[path][0]
+        elements = itertools.cycle([element for element in ELEMENTS if element[0] == path])
+        case_rows = [("OpenURL", "", base_url + path)]
+        while len(case_rows) < steps:
+            if len(case_rows) % 7 == 0:
+                case_rows.append(("AssertTitle", "", title))
+                continue
+            _, kind, locator, text = next(elements)
+            if kind == "text" and not text:
+                case_rows.append(("AssertElement", locator, ""))
+                continue
+            command = COMMANDS[kind][turns[kind] % len(COMMANDS[kind])]
+            turns[kind] += 1
+            value = text
+            if kind == "input":
+                value = f"value {case}"
+            elif command == "SelectByVisible":
+                value = dict(SORT_OPTIONS)[text]
+            case_rows.append((command, locator, value))
+        for step, (command, locator, value) in enumerate(case_rows[:steps], 1):
+            rows.append({'TestCase': f"case{case:05d}", 'Step': step, 'Command': command,
+                         'Locator': locator, 'Value': value})
+    return rows
+
+def synthetic_testcase(cases, steps, base_url=OFFLINE_URL):
+    return pd.DataFrame(synthetic_rows(cases, steps, base_url),
+                        columns=['TestCase', 'Step', 'Command', 'Locator', 'Value'])
+
+def write_workbook(path, cases, steps, base_url=OFFLINE_URL):
+    """Write a synthetic workbook and return its path"""
+    synthetic_testcase(cases, steps, base_url).to_excel(path, index=False)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--cases", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=25, help="steps per test case")
+    parser.add_argument("--base-url", default=OFFLINE_URL, help="where the fixture site is served")
+    args = parser.parse_args(argv)
+    print(write_workbook(args.path, args.cases, args.steps, args.base_url))
+
+if __name__ == "__main__":
+    main()
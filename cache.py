@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from config.settings import CACHE_DIR, CACHE_ENABLED, CACHE_MAX_BYTES
+
+# Bump when a cached loader changes what it returns
+CACHE_VERSION = 1
+
+def _digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def write_atomic(path, data):
+    # Replace in one step so concurrent workers never read a half written entry
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _read_index(index_path):
+    try:
+        with open(index_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def cached_load(path, loader, kind):
+    """Return loader(path), reusing a pickled result while the file content is unchanged.
+
+    Entries are keyed by kind and the SHA-256 of the file. A per-path index
+    remembers the mtime/size the digest was taken at, so unchanged files are
+    not even re-hashed.
+    """
+    path = Path(path)
+    if not CACHE_ENABLED:
+        return loader(path)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    stat = path.stat()
+    path_key = hashlib.sha1(f"{kind}:{path.resolve()}".encode('utf-8')).hexdigest()
+    index_path = CACHE_DIR / f"index-{path_key}.json"
+
+    index = _read_index(index_path)
+    if index and index['mtime'] == stat.st_mtime_ns and index['size'] == stat.st_size:
+        digest = index['digest']
+    else:
+        digest = _digest(path)
+
+    entry_path = CACHE_DIR / f"{kind}-v{CACHE_VERSION}-{digest}.pkl"
+    try:
+        with open(entry_path, 'rb') as f:
+            data = pickle.load(f)
+        os.utime(entry_path)  # Mark as recently used for eviction
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        data = loader(path)
+        write_atomic(entry_path, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        evict()
+
+    if not index or index['digest'] != digest or index['mtime'] != stat.st_mtime_ns:
+        write_atomic(index_path, json.dumps(
+            {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}).encode('utf-8'))
+    return data
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for entry_path in CACHE_DIR.glob("*.pkl"):
+        try:
+            stat = entry_path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            entry_path.unlink()
+        except OSError:
+            continue
+        total -= size
+
+def clear():
+    """Remove every cache entry and index"""
+    for entry_path in CACHE_DIR.glob("*"):
+        entry_path.unlink()
@@ -0,0 +1,231 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from config.settings import JOURNALS_DIR
+from compiler import compile_testcase
+from utils import iter_workbook_cases
+from profiling import StepHook
+
+SETUP_CASE = "(setup)"
+
+class RunJournal(StepHook):
+    """Append-only JSON lines record of a run, written as it happens.
+
+    Records are {"type": "run"} with the workbook and dataset paths, then per test case
+    "case_start", one "step" per executed step and "case_end", and a final
+    "run_end". The last "case_end" is the resumable cursor: an interrupted run
+    restarts from the first case without one. Registered as a StepHook so the
+    executor appends each step when it finishes.
+
+    records holds what was read from an existing journal (for --resume and
+    --rerun-failed) plus the run record; steps written during a run go only
+    to the file, so a long run's memory does not grow with its journal.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = []
+        self.case = None
+        self._file = None  # Opened on the first write, so reading a journal leaves it untouched
+        if self.path.exists():
+            self.records = read_journal(self.path)
+
+    @classmethod
+    def create(cls, workbook, name=None, selection=None, data=None):
+        """Start a journal; selection holds the sheets/names/tags of a streamed run, data its --data"""
+        JOURNALS_DIR.mkdir(parents=True, exist_ok=True)
+        name = name or f"run_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+        journal = cls(JOURNALS_DIR / f"{name}.jsonl")
+        record = {'type': 'run', 'workbook': str(Path(workbook).resolve()),
+                  'selection': selection, 'data': resolve_data(data),
+                  'started': datetime.now().isoformat()}
+        journal._append(record)
+        journal.records.append(record)
+        return journal
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if self._file.tell() and not self.path.read_bytes().endswith(b"\n"):
+                self._file.write("\n")  # Terminate a line cut short by a crash
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    @property
+    def workbook(self):
+        return next(r['workbook'] for r in self.records if r['type'] == 'run')
+
+    @property
+    def selection(self):
+        return next(r.get('selection') for r in self.records if r['type'] == 'run')
+
+    @property
+    def data(self):
+        return next(r.get('data') for r in self.records if r['type'] == 'run')
+
+    def restore_data(self, data=None):
+        """The journaled --data; an explicit one must name the same dataset"""
+        if data and resolve_data(data) != self.data:
+            raise ValueError(f"--data {data} is not the dataset of the journaled run "
+                             f"({self.data or 'the workbook default'})")
+        return self.data
+
+    def resume(self):
+        self._append({'type': 'resume', 'started': datetime.now().isoformat()})
+
+    def start_case(self, case):
+        self.case = case
+        self._append({'type': 'case_start', 'case': case})
+
+    def end_case(self):
+        self._append({'type': 'case_end', 'case': self.case})
+        self.case = None
+
+    def after_step(self, index, step, result):
+        self._append({'type': 'step', 'case': self.case, 'index': index,
+                      'line': step.line, 'outcome': str(result)})
+
+    def finish(self, report_path=None):
+        self._append({'type': 'run_end', 'report': report_path,
+                      'finished': datetime.now().isoformat()})
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finished_cases(self):
+        """Cases that ran to completion, in order"""
+        return [r['case'] for r in self.records if r['type'] == 'case_end' and r['case'] != SETUP_CASE]
+
+    def failed_cases(self):
+        """Cases with at least one failed step in their latest attempt"""
+        outcomes = {}
+        for record in self.records:
+            if record['type'] == 'case_start':
+                outcomes[record['case']] = True
+            elif record['type'] == 'step' and not record['outcome'].startswith("PASS"):
+                outcomes[record['case']] = False
+        return [case for case, passed in outcomes.items() if not passed and case != SETUP_CASE]
+
+    def case_steps(self, cases):
+        """(line, outcome) of the latest attempt at each of the given cases"""
+        attempts = {}
+        for record in self.records:
+            if record['type'] == 'case_start' and record['case'] in cases:
+                attempts[record['case']] = []
+            elif record['type'] == 'step' and record['case'] in attempts:
+                attempts[record['case']].append((record['line'], record['outcome']))
+        return [step for case in cases for step in attempts.get(case, [])]
+
+def resolve_data(data):
+    """A --data argument with its file made absolute, keeping any #Sheet"""
+    if not data:
+        return None
+    path, sep, sheet = str(data).partition('#')
+    return str(Path(path).resolve()) + sep + sheet
+
+def read_journal(path):
+    """Load journal records, skipping lines cut short by a crash"""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def find_journal(path):
+    """Journal for a path that is either a journal or the report it produced"""
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        return path
+    journal_path = JOURNALS_DIR / f"{path.stem}.jsonl"
+    if journal_path.exists():
+        return journal_path
+    # A resumed run's report is named after the resume, not the journal
+    for journal_path in JOURNALS_DIR.glob("*.jsonl"):
+        if any(record.get('report') and Path(record['report']).name == path.name
+               for record in read_journal(journal_path) if record['type'] == 'run_end'):
+            return journal_path
+    raise FileNotFoundError(f"No run journal found for {path}")
+
+def _validate_case(path, sheet, case, parts, translation_table):
+    from validator import validate_testcase, format_issues
+
+    # Streamed cases carry no sheet row numbers, so issues name the case instead
+    errors = [dict(issue, workbook=str(path), sheet=sheet, case=case, row=None)
+              for part in parts for issue in validate_testcase(part, translation_table)
+              if issue['severity'] == 'error']
+    if errors:
+        raise ValueError("Validation failed:\n" + "\n".join(format_issues(errors)))
+
+def plan_cases(setup_df, cases, translation_table, only=None, skip=(), isolate=False):
+    """Compile the (case, plan) segments to run.
+
+    only/skip select cases by name. With isolate every case gets its own copy
+    of the setup steps (re-running failed cases on a fresh browser); otherwise
+    the setup runs once first, as in a normal linear run.
+    """
+    import pandas as pd
+
+    selected = [(name, df) for name, df in cases
+                if (only is None or name in only) and name not in skip]
+    if isolate:
+        return [(name, compile_testcase(pd.concat([setup_df, df]), translation_table))
+                for name, df in selected]
+
+    segments = []
+    if len(setup_df) and selected:
+        segments.append((SETUP_CASE, compile_testcase(setup_df, translation_table)))
+    segments.extend((name, compile_testcase(df, translation_table)) for name, df in selected)
+    return segments
+
+def stream_cases(path, translation_table, sheets=None, names=None, tags=None,
+                 only=None, skip=(), isolate=False, data=None, validate=False):
+    """Yield (sheet, segments, fresh) per selected case while the workbook is still being read.
+
+    Cases are named "<sheet>: <case>". sheet is only given for the first case
+    of each sheet, which also carries that sheet's setup steps (every case
+    does with isolate), so callers can group the report by sheet.
+
+    A case referring to ${column}s runs once per row of the dataset (data as
+    for datadriven.resolve_dataset), as "<sheet>: <case> [<iteration>]" with
+    its own expanded copy of the setup and fresh set, i.e. on a browser reset
+    from the previous iteration. With validate each case is checked
+    before it is compiled, and the first one with errors raises ValueError.
+    """
+    import pandas as pd
+    from datadriven import data_references, resolve_dataset, iter_dataset, expand_testcase
+
+    current = None
+    validated = set()
+    for sheet, setup_df, name, df in iter_workbook_cases(path, sheets, names, tags):
+        case = f"{sheet}: {name}"
+        if validate:
+            # A sheet's setup is shared by its cases, so it is checked once
+            _validate_case(path, sheet, name, (df,) if sheet in validated else (setup_df, df),
+                           translation_table)
+            validated.add(sheet)
+        combined = pd.concat([setup_df, df], ignore_index=True)
+        if data_references(combined):
+            rows = iter_dataset(*resolve_dataset(path, data))
+            for number, _, expanded in expand_testcase(combined, rows):
+                iteration = f"{case} [{number}]"
+                if (only is not None and iteration not in only) or iteration in skip:
+                    continue
+                first = sheet != current
+                current = sheet
+                yield (sheet if first else None), plan_cases(
+                    expanded.iloc[:len(setup_df)], [(iteration, expanded.iloc[len(setup_df):])],
+                    translation_table, isolate=isolate), True
+            continue
+        if (only is not None and case not in only) or case in skip:
+            continue
+        first = sheet != current
+        current = sheet
+        if not (first or isolate):
+            setup_df = setup_df.iloc[0:0]
+        yield (sheet if first else None), plan_cases(setup_df, [(case, df)], translation_table,
+                                                      isolate=isolate), False
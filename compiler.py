@@ -0,0 +1,135 @@
+import ast
+from collections import namedtuple
+from functools import lru_cache
+from utils import render_template, step_command
+from locators import apply_strategy, locator_by
+
+# Placeholders are bound as namespace variables instead of being pasted into
+# the source, so one code object serves every step that uses the same template.
+# Quoted placeholders become plain strings, bare ones (e.g. time.sleep({value}))
+# become the literal the text spells.
+PLACEHOLDER_NAMES = {
+    '{locator}': '_locator',
+    '{value}': '_value',
+    '{url}': '_value',
+}
+
+# by is the selenium By value of the step's {locator} lookup, None without one
+CompiledStep = namedtuple('CompiledStep', ['command', 'line', 'code', 'params', 'error', 'by'],
+                          defaults=(None,))
+
+# Names bound by import statements hoisted out of templates, e.g. Select/ActionChains
+PRELUDE = {}
+
+_template_cache = {}
+
+def _literal(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def _parse(source, filename='<unknown>'):
+    # Multi-statement templates are stored in the workbook with a literal "\n"
+    # between statements (e.g. Hover, DragAndDrop)
+    try:
+        return ast.parse(source, filename, 'exec')
+    except SyntaxError:
+        if '\\n' not in source:
+            raise
+        return ast.parse(source.replace('\\n', '\n'), filename, 'exec')
+
+def _hoist_imports(source, filename):
+    """Run the import statements of a snippet once and compile the remaining body"""
+    module = _parse(source, filename)
+    imports = [node for node in module.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    body = [node for node in module.body if not isinstance(node, (ast.Import, ast.ImportFrom))]
+    if imports:
+        exec(compile(ast.Module(body=imports, type_ignores=[]), filename, 'exec'), PRELUDE)
+    return compile(ast.Module(body=body, type_ignores=[]), filename, 'exec')
+
+def _parameterize(template):
+    """Rewrite a template to read its placeholders from variables, or None if it can't be"""
+    source = template
+    for placeholder, name in PLACEHOLDER_NAMES.items():
+        source = source.replace(f'"{placeholder}"', name)
+        source = source.replace(f"'{placeholder}'", name)
+
+    # A placeholder left inside a larger string literal can only be filled textually
+    try:
+        tree = _parse(source)
+    except SyntaxError:
+        return None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if any(placeholder in node.value for placeholder in PLACEHOLDER_NAMES):
+                return None
+
+    for placeholder, name in PLACEHOLDER_NAMES.items():
+        source = source.replace(placeholder, f'{name}_literal')
+    return source
+
+def compile_template(command, template):
+    """Return (code, names) for a translation table row, compiling it only once.
+
+    The entry is None for templates that have to be rendered per step.
+    """
+    key = (command, template)
+    if key not in _template_cache:
+        source = _parameterize(template)
+        entry = None
+        if source is not None:
+            code = _hoist_imports(source, f'<{command}>')
+            entry = (code, frozenset(code.co_names))
+        _template_cache[key] = entry
+    return _template_cache[key]
+
+@lru_cache(maxsize=4096)
+def compile_line(line):
+    """Compile a generated script line, caching the code object by its source"""
+    return _hoist_imports(line, '<step>')
+
+def _bind(names, locator, value):
+    params = {}
+    if '_locator' in names:
+        params['_locator'] = str(locator)
+    if '_locator_literal' in names:
+        params['_locator_literal'] = _literal(str(locator))
+    if '_value' in names:
+        params['_value'] = str(value)
+    if '_value_literal' in names:
+        params['_value_literal'] = _literal(str(value))
+    return params
+
+def compile_testcase(testcase_df, translation_table):
+    """Turn a test case dataframe into a plan of compiled steps"""
+    plan = []
+    for row in testcase_df.to_dict('records'):
+        command = step_command(row)
+        template = translation_table.get(command, '')
+        if not template:
+            continue
+
+        template, locator, value = apply_strategy(template, row.get('Locator', ''), row.get('Value', ''))
+        line = render_template(template, locator, value)
+        by = locator_by(template)
+        try:
+            entry = compile_template(command, template)
+            if entry is None:
+                plan.append(CompiledStep(command, line, compile_line(line), {}, None, by))
+            else:
+                code, names = entry
+                plan.append(CompiledStep(command, line, code, _bind(names, locator, value), None, by))
+        except SyntaxError as e:
+            plan.append(CompiledStep(command, line, None, {}, e))
+    return plan
+
+def compile_script(script_lines):
+    """Turn already generated script lines into a plan of compiled steps"""
+    plan = []
+    for line in script_lines:
+        try:
+            plan.append(CompiledStep(None, line, compile_line(line), {}, None))
+        except SyntaxError as e:
+            plan.append(CompiledStep(None, line, None, {}, e))
+    return plan
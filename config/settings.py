@@ -8,9 +8,126 @@ REPORTS_DIR.mkdir(exist_ok=True)
 # Browser settings
 BROWSER = "chrome"  # Options: chrome, firefox, edge
 HEADLESS = False
-IMPLICIT_WAIT = 10  # seconds
+IMPLICIT_WAIT = 10  # seconds, also the default explicit wait timeout
+
+# Explicit wait settings (replace the global implicit wait when enabled)
+EXPLICIT_WAITS = True
+POLL_INTERVAL = 0.25  # seconds between element lookups while waiting
+COMMAND_TIMEOUTS = {  # seconds, per command; others use IMPLICIT_WAIT
+    "AssertElement": 5,
+    "AssertText": 5,
+    "AssertContainsText": 5,
+    "PrintText": 5,
+}
+ADAPTIVE_WAITS = True  # learn per-locator timeouts from observed latencies
+MIN_WAIT_SAMPLES = 5  # observations needed before a learned timeout is used
+MIN_TIMEOUT = 2  # seconds, lower bound for learned timeouts
+# Turn a Wait before a locator step into a wait of up to as long for that step's own condition:
+# assertions and reads are retried until they pass, actions wait for a displayed, enabled
+# element. Off by default: a page can still change after that point (e.g. a handler bound
+# late), so only enable it for suites whose Waits just gate on elements appearing
+REPLACE_SLEEPS = False
+
+# Element lookup settings
+ELEMENT_CACHE = True  # reuse found elements until navigation, frame switch or a stale error
+BATCH_LOOKUPS = False  # resolve the locators of consecutive read-only steps in one script call
+READ_ONLY_COMMANDS = {"AssertText", "AssertContainsText", "GetText", "PrintText"}
+# Clicks and other commands that may navigate, submit or re-render the page: cached elements
+# are dropped after them. Typing and selecting keep the cache (a field is usually checked right
+# after it is filled); an element they detach is looked up again on its stale error.
+STATE_CHANGING_COMMANDS = {"Click", "DoubleClick", "RightClick", "DragAndDrop", "AcceptAlert", "DismissAlert"}
+OPTIMIZE_XPATHS = True  # generate ID/CSS lookups for XPaths that have an exact equivalent
+LOCATOR_PROBE_REPEAT = 5  # timed lookups per candidate in `python locators.py measure`
+DRIVER_BACKEND = "selenium"  # Options: selenium, fake (no browser, for dry runs)
+
+# Browser performance profiles, selectable with --profile or a workbook's Settings sheet.
+# headless falls back to HEADLESS; page_load_strategy is normal, eager or none;
+# reuse_profile keeps a browser profile directory (cache, etc.) between runs.
+DEFAULT_PROFILE = "default"
+DRIVER_PROFILES = {
+    "default": {},
+    "fast": {
+        "headless": True,
+        "page_load_strategy": "eager",
+        "disable_images": True,
+        "disable_extensions": True,
+        "window_size": (1366, 768),
+    },
+    "ci": {
+        "headless": True,
+        "page_load_strategy": "eager",
+        "disable_images": True,
+        "disable_fonts": True,
+        "disable_extensions": True,
+        "reuse_profile": True,
+        "window_size": (1280, 800),
+    },
+}
+
+# Suite runner settings
+SUITE_WORKERS = 4  # worker processes, each with its own long-lived driver
+
+# Distributed runs: a coordinator hands workbooks to worker nodes over HTTP
+COORDINATOR_HOST = "127.0.0.1"  # "0.0.0.0" to accept remote workers, which then need the token
+COORDINATOR_PORT = 8765
+# Shared secret workers send with every request; generated and printed when a coordinator
+# listens beyond localhost without one
+COORDINATOR_TOKEN = os.environ.get("BUGZERO_TOKEN")
+WORKER_HEARTBEAT = 2  # seconds between worker heartbeats
+WORKER_TIMEOUT = 15  # seconds without a heartbeat before a worker's workbooks are re-dispatched
+MAX_DISPATCH_ATTEMPTS = 3  # workers that may die on one workbook before it is reported as failed
+
+# Shared prefixes (--share-prefixes): independent cases run common leading steps once and
+# restore a cookies/storage/URL snapshot for each branch. A snapshot can't be taken right
+# after these commands, as their effect lives only in the page (typed text, alerts, frames)
+SHARE_PREFIXES = False
+SNAPSHOT_UNSAFE_COMMANDS = {
+    "InputText", "ClearText", "SelectByValue", "SelectByVisible", "UploadFile", "Hover",
+    "SwitchToFrame", "SwitchToAlert", "GetText", "DragAndDrop", "DoubleClick", "RightClick",
+}
+
+# Resource governor: recycle the browser at test case boundaries past these limits (0 = off)
+GOVERNOR_ENABLED = True
+MAX_BROWSER_RSS_MB = 2048  # memory of the driver and browser process tree
+MAX_BROWSER_HANDLES = 20000  # open handles (Windows) or file descriptors
+MAX_STEPS_PER_SESSION = 5000
+RESOURCE_SAMPLE_EVERY = 50  # steps between resource samples
+MAX_SESSIONS_PER_HOST = 8  # concurrent browser sessions across all processes
+SESSION_SLOT_TIMEOUT = 600  # seconds to wait for a free session slot before failing (0 = forever)
+
+# Data-driven settings: ${column} in Locator/Value cells reads from a dataset row
+DATASET_SHEET = "Data"  # sheet used when neither --data nor a Dataset setting names one
+
+# Results history (SQLite) used for trends, flakiness and --order
+HISTORY_ENABLED = True
+HISTORY_WINDOW = 20  # latest runs per test case used for flakiness and ordering
+
+# Check workbooks offline (commands, placeholders, XPaths, values) before starting a browser
+VALIDATE_BEFORE_RUN = True
+
+# Failure artifacts: screenshot, page source and console log, stored by content hash
+CAPTURE_ARTIFACTS = "failures"  # Options: off, failures, all (every step)
+# gzip console logs, whose report links then download instead of opening; page sources stay
+# plain so the report can show them
+ARTIFACTS_COMPRESS = False
+ARTIFACTS_MAX_BYTES = 1024 * 1024 * 1024  # least recently used artifacts are evicted past this
+ARTIFACTS_MAX_AGE_DAYS = 30
+ARTIFACT_QUEUE_SIZE = 64  # captures waiting for the background writer
+
+# Report settings
+REPORT_PROGRESS_EVERY = 100  # steps between updates of a streaming report's summary JSON
+
+# Cache settings (parsed workbooks, keyed by content hash)
+CACHE_ENABLED = True
+CACHE_MAX_BYTES = 256 * 1024 * 1024
 
 # Path settings
 TRANSLATION_TABLE_PATH = BASE_DIR / "config" / "translation_table.xlsx"
 DEFAULT_TESTCASE_PATH = BASE_DIR / "test_cases.xlsx"
-CHROME_DRIVER_PATH = BASE_DIR / "config" / "chromedriver"
\ No newline at end of file
+CHROME_DRIVER_PATH = BASE_DIR / "config" / "chromedriver"
+GECKO_DRIVER_PATH = BASE_DIR / "config" / "geckodriver"  # .exe is added on Windows
+WAIT_STATS_PATH = REPORTS_DIR / "wait_stats.json"
+CACHE_DIR = BASE_DIR / ".bugzero_cache"
+JOURNALS_DIR = REPORTS_DIR / "journals"
+HISTORY_DB_PATH = REPORTS_DIR / "history.sqlite3"
+ARTIFACTS_DIR = REPORTS_DIR / "artifacts"
\ No newline at end of file
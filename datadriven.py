@@ -0,0 +1,113 @@
+import csv
+import re
+from pathlib import Path
+from config.settings import DATASET_SHEET
+from checkpoint import plan_cases
+from utils import generate_code_from_testcase, split_test_cases, load_workbook_settings
+
+# ${username} in a Locator or Value cell is filled from the dataset column of that name
+DATA_REFERENCE = re.compile(r'\$\{([^}]+)\}')
+DATA_COLUMNS = ('Locator', 'Value')
+
+def data_references(testcase_df):
+    """Names of the dataset columns a test case refers to, in order of appearance"""
+    columns = [column for column in DATA_COLUMNS if column in testcase_df.columns]
+    names = []
+    for row in testcase_df[columns].itertuples(index=False):
+        for cell in row:
+            if isinstance(cell, str) and '${' in cell:
+                names.extend(name for name in (ref.strip() for ref in DATA_REFERENCE.findall(cell))
+                             if name not in names)
+    return names
+
+def resolve_dataset(workbook_path, data=None):
+    """(path, sheet) of the dataset for a workbook.
+
+    data is a .csv file, a workbook, or "workbook.xlsx#Sheet"; without it the
+    workbook's Settings sheet may name one with a Dataset key, else the
+    DATASET_SHEET of the workbook itself is used. sheet is None for CSV files.
+    """
+    workbook_path = Path(workbook_path)
+    if not data:
+        data = load_workbook_settings(workbook_path).get('Dataset') or DATASET_SHEET
+        if not Path(data).suffix:
+            return workbook_path, data  # A sheet of the test case workbook
+        data = str(workbook_path.parent / data)
+    path, _, sheet = str(data).partition('#')
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        return path, None
+    return path, sheet or DATASET_SHEET
+
+def iter_dataset(path, sheet=None):
+    """Yield dataset rows as {column: text} dicts without loading the whole file"""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset not found at {path}")
+    if sheet is None:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield {key.strip(): value or '' for key, value in row.items() if key}
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet not in workbook.sheetnames:
+            raise ValueError(f"Dataset sheet '{sheet}' not found in {path.name}")
+        rows = workbook[sheet].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            if all(cell is None for cell in values):
+                continue
+            yield {key: '' if cell is None else str(cell) for key, cell in zip(header, values) if key}
+    finally:
+        workbook.close()
+
+def substitute(text, data):
+    """Replace the ${column} references of a cell with values from a dataset row"""
+    return DATA_REFERENCE.sub(lambda match: data[match.group(1).strip()], text)
+
+def expand_testcase(testcase_df, rows):
+    """Yield (number, data, testcase_df) for each dataset row, one iteration at a time.
+
+    Only the cells holding references are rewritten, on a copy of the test
+    case, so memory stays flat however many rows the dataset has.
+    """
+    cells = [(index, column) for column in DATA_COLUMNS if column in testcase_df.columns
+             for index, cell in testcase_df[column].items() if isinstance(cell, str) and '${' in cell]
+    names = data_references(testcase_df)
+    for number, data in enumerate(rows, 1):
+        missing = [name for name in names if name not in data]
+        if missing:
+            raise ValueError(f"Dataset has no column for: {', '.join(missing)}")
+        df = testcase_df.copy()
+        for index, column in cells:
+            df.at[index, column] = substitute(testcase_df.at[index, column], data)
+        yield number, data, df
+
+def iteration_label(number, data, names):
+    values = ', '.join(f"{name}={data[name]}" for name in names)
+    return f"Iteration {number}: {values}" if values else f"Iteration {number}"
+
+def iter_generated_code(testcase_df, translation_table, rows):
+    """Data-driven generate_code_from_testcase: yields (label, script_lines) per dataset row"""
+    names = data_references(testcase_df)
+    for number, data, df in expand_testcase(testcase_df, rows):
+        yield iteration_label(number, data, names), generate_code_from_testcase(df, translation_table)
+
+def iter_iterations(testcase_df, default_name, translation_table, rows,
+                    only=None, skip=(), isolate=False):
+    """Yield (label, segments, fresh) per dataset row, segments as from checkpoint.plan_cases.
+
+    Test cases are named "<case> [<iteration>]" so journals, --resume and
+    --rerun-failed tell the iterations apart. fresh is always True: an
+    iteration must not see the cookies and page state of the one before.
+    """
+    names = data_references(testcase_df)
+    for number, data, df in expand_testcase(testcase_df, rows):
+        setup_df, cases = split_test_cases(df, default_name)
+        cases = [(f"{name} [{number}]", case_df) for name, case_df in cases]
+        segments = plan_cases(setup_df, cases, translation_table, only=only, skip=skip, isolate=isolate)
+        if segments:
+            yield iteration_label(number, data, names), segments, True
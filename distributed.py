@@ -0,0 +1,348 @@
+import base64
+import hmac
+import json
+import multiprocessing
+import secrets
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from config.settings import (COORDINATOR_HOST, COORDINATOR_PORT, COORDINATOR_TOKEN, WORKER_HEARTBEAT,
+                             WORKER_TIMEOUT, MAX_DISPATCH_ATTEMPTS, HISTORY_ENABLED)
+from datadriven import data_references, resolve_dataset
+from history import ResultsHistory, order_workbooks
+from logger import StreamingHTMLReport
+from runner import run_workbook, driver_options
+from utils import load_translation_table, load_testcase
+
+# Coordinator and workers talk JSON over plain HTTP; no broker is involved.
+#   POST /lease      {"worker"}                 -> {"task": {"id", "name", "content", "dataset"?} | null, "done"}
+#                    dataset is {"name", "sheet", "content"} when the workbook reads one from another file
+#   POST /heartbeat  {"worker"}                 -> {"ok": true}
+#   POST /result     {"worker", "id", "record"} -> {"ok": true}
+#   GET  /status                                -> counts of pending, leased and finished tasks
+# With a token every request carries it in the TOKEN_HEADER; others get 401.
+TOKEN_HEADER = "X-Bugzero-Token"
+LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+class Coordinator:
+    """Hands suite workbooks to worker nodes and collects their result records.
+
+    Workbooks are queued longest first by their durations in the results
+    history, and idle workers pull the next one, so long workbooks start early
+    and the shards even out (longest processing time first scheduling). A
+    worker that misses heartbeats for WORKER_TIMEOUT seconds is presumed dead
+    and its workbooks go back to the front of the queue. Records are streamed
+    into one report as they arrive.
+
+    Listening beyond localhost requires a token, since leases hand out
+    workbook contents and results go into the report and history; one is
+    generated when neither token nor COORDINATOR_TOKEN is set.
+    """
+    def __init__(self, workbooks, host=None, port=None, report=None, token=None):
+        host = host or COORDINATOR_HOST
+        self.token = token or COORDINATOR_TOKEN
+        if not self.token and host not in LOOPBACK_HOSTS:
+            self.token = secrets.token_urlsafe(24)
+        workbooks = [str(p) for p in workbooks]
+        self.workbooks = workbooks
+        dispatch = order_workbooks(workbooks, "longest") if HISTORY_ENABLED else workbooks
+        self.pending = deque(workbooks.index(path) for path in dispatch)
+        self.attempts = [0] * len(workbooks)
+        self.leases = {}  # task id -> worker
+        self.seen = {}  # worker -> last contact (monotonic)
+        self.records = [None] * len(workbooks)
+        self.report = report
+        self.history = ResultsHistory() if HISTORY_ENABLED else None
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.server = ThreadingHTTPServer((host, port if port is not None else COORDINATOR_PORT),
+                                          self._handler_class())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        if host == "0.0.0.0":
+            host = socket.gethostname()
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        coordinator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _authorized(self):
+                if not coordinator.token:
+                    return True
+                if hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), coordinator.token):
+                    return True
+                self._reply({'error': "missing or wrong token"}, 401)
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                if self.path == "/status":
+                    self._reply(coordinator.status())
+                else:
+                    self._reply({'error': "not found"}, 404)
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    routes = {'/lease': coordinator.lease, '/heartbeat': coordinator.heartbeat,
+                              '/result': coordinator.result}
+                    if self.path not in routes:
+                        self._reply({'error': "not found"}, 404)
+                        return
+                    self._reply(routes[self.path](body))
+                except (ValueError, KeyError) as e:
+                    self._reply({'error': str(e)}, 400)
+
+            def _reply(self, data, status=200):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Keep worker polling out of the console
+
+        return Handler
+
+    def heartbeat(self, body):
+        with self.lock:
+            self.seen[body['worker']] = time.monotonic()
+        return {'ok': True}
+
+    def lease(self, body):
+        worker = body['worker']
+        while True:
+            with self.lock:
+                self.seen[worker] = time.monotonic()
+                if not self.pending:
+                    return {'task': None, 'done': self.finished.is_set()}
+                task_id = self.pending.popleft()
+                self.leases[task_id] = worker
+                self.attempts[task_id] += 1
+            path = Path(self.workbooks[task_id])
+            try:
+                task = self._task(task_id, path)
+            except Exception as e:
+                with self.lock:
+                    self.leases.pop(task_id, None)
+                    self._store(task_id, {'workbook': str(path), 'lines': [], 'results': [],
+                                          'error': f"Not dispatched: {e}"})
+                continue
+            print(f"Dispatching {path.name} to {worker}")
+            return {'task': task, 'done': False}
+
+    def _task(self, task_id, path):
+        # Workers need not share a filesystem with the coordinator: the workbook and a dataset
+        # it reads from another file travel with the task
+        task = {'id': task_id, 'name': path.name, 'content': _encode(path)}
+        if data_references(load_testcase(path)):
+            dataset, sheet = resolve_dataset(path)
+            if Path(dataset).resolve() != path.resolve():
+                if not Path(dataset).exists():
+                    raise FileNotFoundError(f"Dataset not found at {dataset}")
+                task['dataset'] = {'name': Path(dataset).name, 'sheet': sheet, 'content': _encode(dataset)}
+        return task
+
+    def result(self, body):
+        task_id, record = body['id'], body['record']
+        with self.lock:
+            self.seen[body['worker']] = time.monotonic()
+            if self.records[task_id] is not None:
+                return {'ok': True}  # A re-dispatched copy finished first
+            self.leases.pop(task_id, None)
+            if task_id in self.pending:
+                self.pending.remove(task_id)
+            record['workbook'] = self.workbooks[task_id]
+            record['worker'] = body['worker']
+            self._store(task_id, record)
+        return {'ok': True}
+
+    def _store(self, task_id, record):
+        # Called with the lock held
+        self.records[task_id] = record
+        if self.report:
+            self.report.start_group(f"{Path(record['workbook']).name} ({record.get('worker', '-')})")
+            for line, outcome in zip(record['lines'], record['results']):
+                self.report.add_row(line, outcome)
+            if record['error']:
+                self.report.add_row("(workbook)", f"FAIL: {record['error']}")
+        if self.history and record.get('durations'):
+            self.history.add_record(record)
+        if all(r is not None for r in self.records):
+            self.finished.set()
+
+    def reclaim_dead_workers(self):
+        """Put the workbooks of workers that stopped sending heartbeats back in the queue"""
+        now = time.monotonic()
+        with self.lock:
+            for task_id, worker in list(self.leases.items()):
+                if now - self.seen.get(worker, 0) < WORKER_TIMEOUT:
+                    continue
+                del self.leases[task_id]
+                if self.attempts[task_id] >= MAX_DISPATCH_ATTEMPTS:
+                    self._store(task_id, {'workbook': self.workbooks[task_id], 'lines': [], 'results': [],
+                                          'error': f"Gave up after {self.attempts[task_id]} workers died"})
+                else:
+                    print(f"Worker {worker} is gone, re-dispatching {Path(self.workbooks[task_id]).name}")
+                    self.pending.appendleft(task_id)
+
+    def status(self):
+        with self.lock:
+            return {'workbooks': len(self.workbooks), 'pending': len(self.pending),
+                    'leased': len(self.leases), 'finished': sum(r is not None for r in self.records),
+                    'workers': sorted(self.seen)}
+
+    def run(self, timeout=None):
+        """Serve until every workbook has a record (or timeout) and return the records"""
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            while not self.finished.wait(WORKER_HEARTBEAT):
+                self.reclaim_dead_workers()
+                if deadline and time.monotonic() > deadline:
+                    break
+            # Let polling workers learn the run is over before the server goes away
+            time.sleep(WORKER_HEARTBEAT)
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+            if self.history:
+                self.history.close()
+        return [record or {'workbook': self.workbooks[i], 'lines': [], 'results': [],
+                           'error': "No worker finished this workbook"}
+                for i, record in enumerate(self.records)]
+
+def _encode(path):
+    return base64.b64encode(Path(path).read_bytes()).decode('ascii')
+
+def _post(url, path, data, token=None, timeout=30):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers[TOKEN_HEADER] = token
+    request = urllib.request.Request(url.rstrip('/') + path, data=json.dumps(data).encode('utf-8'),
+                                     headers=headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def _heartbeat_loop(url, name, token, stop):
+    while not stop.wait(WORKER_HEARTBEAT):
+        try:
+            _post(url, "/heartbeat", {'worker': name}, token, timeout=WORKER_HEARTBEAT)
+        except OSError:
+            pass  # The lease loop decides when the coordinator is really gone
+
+def run_worker(url, backend=None, browser=None, profile=None, name=None, slot=0, token=None):
+    """Worker node loop: lease workbooks from the coordinator, run them, send back records"""
+    from executor import TestExecutor
+
+    name = name or f"{socket.gethostname()}-{multiprocessing.current_process().pid}"
+    token = token or COORDINATOR_TOKEN
+    translation_table = load_translation_table()
+    workdir = Path(tempfile.mkdtemp(prefix="bugzero_worker_"))
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat_loop, args=(url, name, token, stop), daemon=True).start()
+    executor = None
+    current = None
+    unreachable_since = None
+    try:
+        while True:
+            try:
+                reply = _post(url, "/lease", {'worker': name}, token)
+                unreachable_since = None
+            except urllib.error.HTTPError as e:
+                if e.code == 401:
+                    raise PermissionError(f"Coordinator at {url} rejected the token (see --token)")
+                raise
+            except OSError:
+                # The coordinator shuts down once every workbook has a record
+                unreachable_since = unreachable_since or time.monotonic()
+                if time.monotonic() - unreachable_since > WORKER_TIMEOUT:
+                    break
+                time.sleep(WORKER_HEARTBEAT)
+                continue
+            if reply['done']:
+                break
+            task = reply['task']
+            if task is None:
+                time.sleep(WORKER_HEARTBEAT / 2)
+                continue
+
+            taskdir = workdir / str(task['id'])
+            taskdir.mkdir(exist_ok=True)
+            path = taskdir / task['name']
+            path.write_bytes(base64.b64decode(task['content']))
+            data = None
+            if task.get('dataset'):
+                dataset = taskdir / f"dataset-{task['dataset']['name']}"
+                dataset.write_bytes(base64.b64decode(task['dataset']['content']))
+                data = str(dataset) + (f"#{task['dataset']['sheet']}" if task['dataset']['sheet'] else "")
+            try:
+                wanted = driver_options(path, backend, browser, profile)
+                if executor is None or wanted != current:
+                    if executor:
+                        executor.close()
+                    executor = None
+                    executor = TestExecutor(slot=slot, **wanted)
+                    current = wanted
+                else:
+                    executor.maybe_recycle()
+                record = run_workbook(executor, path, translation_table, data=data)
+            except Exception as e:
+                record = {'workbook': str(path), 'lines': [], 'results': [], 'error': f"Driver start failed: {e}"}
+            record.pop('resources', None)
+            shutil.rmtree(taskdir, ignore_errors=True)
+            try:
+                _post(url, "/result", {'worker': name, 'id': task['id'], 'record': record}, token)
+            except OSError:
+                pass  # The lease timed out meanwhile and another worker ran it
+    finally:
+        stop.set()
+        if executor:
+            executor.close()
+
+def run_distributed(workbooks, host=None, port=None, local_workers=0, backend=None,
+                    browser=None, profile=None, report_name=None, token=None):
+    """Coordinate a suite over HTTP, optionally with local worker processes.
+
+    Returns (records, report_path). Remote nodes join with
+    `python main.py --worker http://<coordinator>:<port> --token <token>`.
+    """
+    report_name = report_name or f"suite_report_{time.strftime('%Y-%m-%d_%H-%M-%S')}"
+    report = StreamingHTMLReport(f"{report_name}.html")
+    coordinator = Coordinator(workbooks, host, port, report, token)
+    print(f"Coordinator listening on {coordinator.url}, streaming report to {report.path}")
+    if coordinator.token and not (token or COORDINATOR_TOKEN):
+        print(f"Workers join with: python main.py --worker {coordinator.url} --token {coordinator.token}")
+    processes = [
+        multiprocessing.Process(target=run_worker, daemon=True,
+                                args=(f"http://127.0.0.1:{coordinator.server.server_address[1]}",
+                                      backend, browser, profile, f"local-{slot}", slot, coordinator.token))
+        for slot in range(local_workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        records = coordinator.run()
+    finally:
+        report_path = report.close()
+        for process in processes:
+            process.join(timeout=10)
+    return records, report_path
@@ -0,0 +1,132 @@
+import itertools
+import os
+import tempfile
+from pathlib import Path
+from selenium import webdriver
+from config.settings import (BROWSER, HEADLESS, IMPLICIT_WAIT, DRIVER_BACKEND, CHROME_DRIVER_PATH,
+                             GECKO_DRIVER_PATH, DRIVER_PROFILES, DEFAULT_PROFILE)
+from governor import acquire_lock, release_lock
+
+# Reusable browser profile directories per browser, profile and slot, each locked while in use
+PROFILE_ROOT = Path(tempfile.gettempdir()) / "bugzero_profiles"
+
+def resolve_profile(name=None):
+    """Settings of a named performance profile from DRIVER_PROFILES"""
+    name = name or DEFAULT_PROFILE
+    if name not in DRIVER_PROFILES:
+        raise ValueError(f"Unknown driver profile: {name} (choose from {', '.join(DRIVER_PROFILES)})")
+    return DRIVER_PROFILES[name]
+
+def _driver_path(path):
+    """Bundled driver executable if present, else None to let Selenium Manager find one"""
+    path = Path(path)
+    if os.name == 'nt':
+        path = path.with_suffix('.exe')
+    return str(path) if path.is_file() else None
+
+def _profile_dir(browser, profile_name, slot):
+    """(directory, lock) of the first free reusable profile from slot on.
+
+    Slots only number the workers of one run, so concurrent runs (or local
+    and distributed workers on one host) would otherwise open the same
+    profile, which browsers refuse or corrupt.
+    """
+    PROFILE_ROOT.mkdir(parents=True, exist_ok=True)
+    for candidate in itertools.count(slot):
+        path = PROFILE_ROOT / f"{browser}-{profile_name}-{candidate}"
+        lock = PROFILE_ROOT / f"{path.name}.lock"
+        if acquire_lock(lock):
+            path.mkdir(exist_ok=True)
+            return str(path), lock
+
+def _release_on_quit(driver, lock):
+    quit = driver.quit
+
+    def quit_and_release():
+        try:
+            quit()
+        finally:
+            release_lock(lock)
+    driver.quit = quit_and_release
+
+def _chromium_options(options, settings, profile_dir):
+    if settings.get('headless', HEADLESS):
+        options.add_argument("--headless=new")
+    if settings.get('disable_images'):
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if settings.get('disable_fonts'):
+        options.add_argument("--disable-remote-fonts")
+    if settings.get('disable_extensions'):
+        options.add_argument("--disable-extensions")
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    if settings.get('window_size'):
+        width, height = settings['window_size']
+        options.add_argument(f"--window-size={width},{height}")
+    return options
+
+def _firefox_options(options, settings, profile_dir):
+    if settings.get('headless', HEADLESS):
+        options.add_argument("-headless")
+    if settings.get('disable_images'):
+        options.set_preference("permissions.default.image", 2)
+    if settings.get('disable_fonts'):
+        options.set_preference("gfx.downloadable_fonts.enabled", False)
+    if settings.get('disable_extensions'):
+        options.set_preference("extensions.enabled", False)
+    if profile_dir:
+        options.add_argument("-profile")
+        options.add_argument(profile_dir)
+    if settings.get('window_size'):
+        width, height = settings['window_size']
+        options.add_argument(f"--width={width}")
+        options.add_argument(f"--height={height}")
+    return options
+
+def create_driver(backend=None, browser=None, profile=None, slot=0):
+    """Create a driver for the given backend ("selenium" or "fake").
+
+    browser defaults to settings.BROWSER (chrome, firefox or edge) and profile
+    names an entry of settings.DRIVER_PROFILES. slot is the first reusable
+    profile directory to try; one in use by another driver is skipped.
+    """
+    backend = backend or DRIVER_BACKEND
+    if backend == "fake":
+        from fake_driver import FakeDriver
+        return FakeDriver()
+    if backend != "selenium":
+        raise ValueError(f"Unknown driver backend: {backend}")
+
+    browser = (browser or BROWSER).lower()
+    profile_name = profile or DEFAULT_PROFILE
+    settings = resolve_profile(profile_name)
+    profile_dir, lock = None, None
+    if settings.get('reuse_profile'):
+        profile_dir, lock = _profile_dir(browser, profile_name, slot)
+
+    if browser == "chrome":
+        options = _chromium_options(webdriver.ChromeOptions(), settings, profile_dir)
+        service = webdriver.ChromeService(executable_path=_driver_path(CHROME_DRIVER_PATH))
+        factory = webdriver.Chrome
+    elif browser == "edge":
+        options = _chromium_options(webdriver.EdgeOptions(), settings, profile_dir)
+        service = webdriver.EdgeService()
+        factory = webdriver.Edge
+    elif browser == "firefox":
+        options = _firefox_options(webdriver.FirefoxOptions(), settings, profile_dir)
+        service = webdriver.FirefoxService(executable_path=_driver_path(GECKO_DRIVER_PATH))
+        factory = webdriver.Firefox
+    else:
+        raise ValueError(f"Unsupported browser: {browser} (choose from chrome, firefox, edge)")
+
+    options.page_load_strategy = settings.get('page_load_strategy', 'normal')
+    try:
+        driver = factory(options=options, service=service)
+    except Exception:
+        if lock:
+            release_lock(lock)
+        raise
+    if lock:
+        _release_on_quit(driver, lock)
+    driver.implicitly_wait(IMPLICIT_WAIT)
+    return driver
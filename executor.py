@@ -1,31 +1,253 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from config.settings import IMPLICIT_WAIT
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+from config.settings import (EXPLICIT_WAITS, REPLACE_SLEEPS, BATCH_LOOKUPS, READ_ONLY_COMMANDS,
+                             STATE_CHANGING_COMMANDS, GOVERNOR_ENABLED, MAX_SESSIONS_PER_HOST, CAPTURE_ARTIFACTS)
+from drivers import create_driver
+from itertools import takewhile
+from compiler import PRELUDE, compile_script
+from waits import WaitingDriver, load_policy
+from profiling import StepMetrics, StepResult
+from governor import ResourceGovernor, SessionSlot
+from artifacts import ArtifactCapture
 import time
 
+# Steps whose outcome is their condition: after a replaced Wait they are retried until they pass
+CONDITION_COMMANDS = READ_ONLY_COMMANDS | {"AssertElement"}
+
+def reset_driver(driver):
+    """Bring a reused driver back to a clean state between test cases"""
+    try:
+        driver.delete_all_cookies()
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except Exception:
+        pass  # Storage is not accessible on about:blank and data: pages
+    driver.get("about:blank")
+
 class TestExecutor:
-    def __init__(self, driver=None):
-        self.driver = driver or self._create_driver()
-        
-    def _create_driver(self):
-        driver = webdriver.Chrome()
-        driver.implicitly_wait(IMPLICIT_WAIT)
-        return driver
-        
+    def __init__(self, driver=None, backend=None, wait_policy=None, hooks=None,
+                 browser=None, profile=None, slot=0, governor=None):
+        # Only sessions this executor starts count against the host cap and can be recycled
+        self.owns_driver = driver is None
+        self.session_slot = None
+        if self.owns_driver and MAX_SESSIONS_PER_HOST:
+            self.session_slot = SessionSlot.acquire()
+        self._driver_args = (backend, browser, profile, slot)
+        self.hooks = list(hooks or [])
+        self.metrics = StepMetrics()
+        self.wait_policy = None
+        if EXPLICIT_WAITS:
+            self.wait_policy = wait_policy or load_policy()
+        self.governor = governor
+        if self.governor is None and GOVERNOR_ENABLED and self.owns_driver:
+            self.governor = ResourceGovernor()
+        if self.governor:
+            self.hooks.append(self.governor)
+        self.artifacts = ArtifactCapture() if CAPTURE_ARTIFACTS != "off" else None
+        if self.artifacts:
+            self.hooks.append(self.artifacts)
+        try:
+            self._start_session(driver or self._create_driver(*self._driver_args))
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _create_driver(self, backend=None, browser=None, profile=None, slot=0):
+        return create_driver(backend, browser, profile, slot)
+
+    def _start_session(self, driver):
+        self.driver = driver
+        if self.wait_policy:
+            # Lookups wait explicitly per command, so the implicit wait must not stack on top
+            self.driver.implicitly_wait(0)
+        self.waiter = WaitingDriver(self.driver, self.wait_policy, self.metrics)
+        self._instrument_driver()
+        # Hooks that talk to the browser themselves (governor, artifacts) follow the session
+        for hook in self.hooks:
+            if hasattr(hook, 'attach'):
+                hook.attach(self.driver)
+
+    def maybe_recycle(self):
+        """At a test case boundary, replace the browser if the governor asks for it.
+
+        Returns True when a new session was started, so callers can replay
+        any setup steps the next case depends on.
+        """
+        if not self.governor or not self.owns_driver:
+            return False
+        reason = self.governor.recycle_reason()
+        if not reason:
+            return False
+        self.recycle(reason)
+        return True
+
+    def recycle(self, reason="requested"):
+        """Quit the current browser and continue on a fresh one"""
+        print(f"Recycling browser session: {reason}")
+        if self.governor:
+            self.governor.record_recycle(reason)
+        try:
+            self.driver.quit()
+        except Exception:
+            pass  # The old session may already be dead
+        self._start_session(self._create_driver(*self._driver_args))
+
+    def _instrument_driver(self):
+        # Every WebDriver round trip (element methods included) goes through execute
+        execute = getattr(self.driver, 'execute', None)
+        if callable(execute):
+            # A driver handed over from another executor is re-wrapped, not wrapped twice
+            execute = getattr(execute, '_untimed', execute)
+            self.driver.execute = self.metrics.timed(execute)
+            self.driver.execute._untimed = execute
+
+    def add_hook(self, hook):
+        """Register a profiling.StepHook called before and after every step"""
+        self.hooks.append(hook)
+
+    def create_namespace(self):
+        """Globals shared by every step of one test case"""
+        namespace = dict(PRELUDE)
+        namespace.update({'driver': self.waiter, 'By': By,
+                          'WebDriverWait': WebDriverWait, 'EC': EC, 'time': time})
+        return namespace
+
     def execute_script(self, script_lines):
-        results = []
-        for line in script_lines:
+        return self.execute_plan(compile_script(script_lines))
+
+    def execute_plan(self, plan):
+        """Execute compiled steps (see compiler.compile_testcase) in one namespace"""
+        return [result.outcome for _, result in self.iter_plan(plan)]
+
+    def execute_steps(self, plan):
+        """Like execute_plan, but return profiling.StepResult objects with timings"""
+        return [result for _, result in self.iter_plan(plan)]
+
+    def iter_plan(self, plan, namespace=None):
+        """Execute compiled steps, yielding (step, StepResult) as each one finishes.
+
+        Pass a namespace from create_namespace() to continue the variables of
+        an earlier plan.
+        """
+        if namespace is None:
+            namespace = self.create_namespace()
+        self.waiter.invalidate()
+        sleep_floor = 0
+        prefetched_until = 0
+        try:
+            for index, step in enumerate(plan):
+                for hook in self.hooks:
+                    hook.before_step(index, step)
+                self.metrics.reset()
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                try:
+                    print(f"Executing: {step.line}")
+                    if step.error:
+                        raise step.error
+                    if self._replaces_sleep(plan, index):
+                        # The next step waits up to as long for its own condition instead
+                        sleep_floor = step.params['_value_literal']
+                    else:
+                        floor, sleep_floor = sleep_floor, 0
+                        self.waiter.begin_step(step.command, floor)
+                        if BATCH_LOOKUPS and index >= prefetched_until:
+                            prefetched_until = self._prefetch_read_only(plan, index)
+                        namespace.update(step.params)
+                        if floor:
+                            self._exec_after_sleep(step, namespace, floor)
+                        else:
+                            self._exec_step(step, namespace)
+                    outcome = "PASS"
+                except Exception as e:
+                    outcome = f"FAIL: {str(e)}"
+                if step.command in STATE_CHANGING_COMMANDS:
+                    # The page may have re-rendered: elements found so far could show stale state
+                    self.waiter.invalidate()
+
+                wall_time = time.perf_counter() - wall_start
+                # A Wait step's whole duration is sleeping
+                wait_time = wall_time if step.command == "Wait" else self.metrics.wait_time
+                result = StepResult(index + 1, step.command, step.line, outcome, wall_time,
+                                    time.process_time() - cpu_start, self.metrics.driver_time,
+                                    self.metrics.lookups, wait_time)
+                for hook in self.hooks:
+                    hook.after_step(index, step, result)
+                yield step, result
+        finally:
+            if self.wait_policy and self.wait_policy.stats is not None:
+                self.wait_policy.stats.save_if_due()
+
+    def _exec_step(self, step, namespace):
+        try:
+            exec(step.code, namespace)
+        except StaleElementReferenceException:
+            # A cached element went stale (e.g. the previous click navigated): look it up again once
+            self.waiter.invalidate()
+            exec(step.code, namespace)
+
+    def _prefetch_read_only(self, plan, index):
+        """Resolve the locators of the run of read-only steps starting at index in one call"""
+        run = list(takewhile(lambda s: s.command in READ_ONLY_COMMANDS and s.by and '_locator' in s.params,
+                             plan[index:]))
+        if run:
+            self.waiter.prefetch_locators([(s.by, s.params['_locator']) for s in run])
+        return index + max(len(run), 1)
+
+    def _exec_after_sleep(self, step, namespace, floor):
+        """Run the step a replaced Wait stood before, once the condition it needs holds.
+
+        Assertions and reads are retried until they pass, so a text that is
+        still changing gets the whole floor to settle. Actions wait until
+        their element is displayed and enabled. Either way no longer than
+        the sleep would have taken before giving up.
+        """
+        deadline = time.monotonic() + floor
+        poll = self.waiter.policy.poll_interval
+        if step.command not in CONDITION_COMMANDS:
+            self._wait_interactable(step, deadline, poll)
+            self._exec_step(step, namespace)
+            return
+        while True:
+            try:
+                self._exec_step(step, namespace)
+                return
+            except (AssertionError, WebDriverException):
+                if time.monotonic() + poll >= deadline:
+                    raise
+                time.sleep(poll)
+
+    def _wait_interactable(self, step, deadline, poll):
+        if not step.by:
+            return
+        while time.monotonic() < deadline:
             try:
-                print(f"Executing: {line}")
-                exec(line, {'driver': self.driver, 'By': By, 
-                           'WebDriverWait': WebDriverWait, 'EC': EC})
-                results.append("PASS")
-            except Exception as e:
-                results.append(f"FAIL: {str(e)}")
-        return results
+                element = self.driver.find_element(step.by, step.params['_locator'])
+                if element.is_displayed() and element.is_enabled():
+                    return
+            except WebDriverException:
+                pass
+            time.sleep(poll)
+
+    def _replaces_sleep(self, plan, index):
+        step = plan[index]
+        return (REPLACE_SLEEPS and self.waiter.policy is not None and step.command == "Wait"
+                and isinstance(step.params.get('_value_literal'), (int, float))
+                and index + 1 < len(plan) and '_locator' in plan[index + 1].params)
+
+    def _release_slot(self):
+        if self.session_slot:
+            self.session_slot.release()
+            self.session_slot = None
 
     def close(self):
-        if self.driver:
-            self.driver.quit()
\ No newline at end of file
+        if self.artifacts:
+            self.artifacts.close()
+        if self.wait_policy and self.wait_policy.stats is not None:
+            self.wait_policy.stats.save()
+        try:
+            if self.driver:
+                self.driver.quit()
+        finally:
+            self._release_slot()
@@ -0,0 +1,225 @@
+import re
+from selenium.common.exceptions import NoAlertPresentException, NoSuchElementException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webelement import WebElement
+
+# The option lookups of selenium's Select: option[value ="v"] and .//option[normalize-space(.) = "text"]
+OPTION_QUERY = re.compile(r'=\s*(["\'])(.*)\1\]$')
+
+class FakeElement(WebElement):
+    """In-memory stand-in for a WebElement.
+
+    A WebElement subclass so ActionChains accepts it; its id is the locator it
+    was found by. Selects carry option children for selenium's Select.
+    """
+    def __init__(self, driver, locator, tag_name='div', options=()):
+        super().__init__(driver, locator)
+        self.driver = driver
+        self.locator = locator
+        self._tag_name = tag_name
+        self.value = ''
+        self.selected = False
+        self.options = [FakeOption(driver, f"{locator}/option[{i}]", self, value, label)
+                        for i, (value, label) in enumerate(options, 1)]
+
+    @property
+    def tag_name(self):
+        return self._tag_name
+
+    @property
+    def text(self):
+        return self.driver.texts.get(self.locator, self.value)
+
+    def find_elements(self, by=By.ID, value=None):
+        if by == By.TAG_NAME:
+            return list(self.options) if value == 'option' else []
+        match = OPTION_QUERY.search(value or '')
+        if not match:
+            raise WebDriverException(f"FakeElement does not implement the lookup {value}")
+        key = 'value' if by == By.CSS_SELECTOR else 'label'
+        return [option for option in self.options if getattr(option, key) == match.group(2)]
+
+    def find_element(self, by=By.ID, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"Unable to locate element: {value}")
+        return elements[0]
+
+    def is_selected(self):
+        return self.selected
+
+    def get_dom_attribute(self, name):
+        return None
+
+    def value_of_css_property(self, property_name):
+        return ''
+
+    def send_keys(self, *keys):
+        self.value += ''.join(str(key) for key in keys)
+
+    def clear(self):
+        self.value = ''
+
+    def click(self):
+        self.driver.clicks.append(self.locator)
+
+    def is_enabled(self):
+        return True
+
+    def is_displayed(self):
+        return True
+
+    def get_attribute(self, name):
+        return self.value if name == 'value' else None
+
+class FakeOption(FakeElement):
+    """An <option> of a fake select; clicking it selects it"""
+    def __init__(self, driver, locator, select, value, label):
+        super().__init__(driver, locator, 'option')
+        self.select = select
+        self.value = value
+        self.label = label
+
+    @property
+    def text(self):
+        return self.label
+
+    def click(self):
+        for option in self.select.options:
+            option.selected = option is self
+        self.select.value = self.value
+
+class FakeAlert:
+    def __init__(self, driver):
+        self.driver = driver
+        self.text = ''
+
+    def accept(self):
+        self.driver.alert_open = False
+
+    def dismiss(self):
+        self.driver.alert_open = False
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @property
+    def alert(self):
+        if not self.driver.alert_open:
+            raise NoAlertPresentException("no such alert")
+        return FakeAlert(self.driver)
+
+    def frame(self, frame_reference):
+        self.driver.frame = frame_reference
+
+    def default_content(self):
+        self.driver.frame = None
+
+class FakeDriver:
+    """Browserless WebDriver backend for running the scheduler and benchmarks.
+
+    titles maps URLs to page titles, texts maps locators to element text,
+    selects maps locators of <select> elements to their (value, label)
+    options and missing lists locators that raise NoSuchElementException.
+    Pointer actions (ActionChains) count a release as a click on the element
+    the pointer last moved to.
+    """
+    session_id = "fake"
+
+    def __init__(self, titles=None, texts=None, missing=None, selects=None):
+        self.titles = titles or {}
+        self.texts = texts or {}
+        self.selects = selects or {}
+        self.missing = set(missing or ())
+        self.history = ['about:blank']
+        self.position = 0
+        self.cookies = []
+        self.clicks = []
+        self.frame = None
+        self.alert_open = False
+        self.switch_to = FakeSwitchTo(self)
+        self.elements = {}
+
+    @property
+    def current_url(self):
+        return self.history[self.position]
+
+    @property
+    def title(self):
+        return self.titles.get(self.current_url, '')
+
+    @property
+    def page_source(self):
+        return f"<html><head><title>{self.title}</title></head><body></body></html>"
+
+    def get(self, url):
+        del self.history[self.position + 1:]
+        self.history.append(url)
+        self.position += 1
+        self.elements = {}
+
+    def back(self):
+        self.position = max(self.position - 1, 0)
+
+    def forward(self):
+        self.position = min(self.position + 1, len(self.history) - 1)
+
+    def refresh(self):
+        self.elements = {}
+
+    def find_element(self, by, value=None):
+        if value in self.missing:
+            raise NoSuchElementException(f"Unable to locate element: {value}")
+        if value not in self.elements:
+            if value in self.selects:
+                self.elements[value] = FakeElement(self, value, 'select', self.selects[value])
+            else:
+                self.elements[value] = FakeElement(self, value)
+        return self.elements[value]
+
+    def find_elements(self, by, value=None):
+        if value in self.missing:
+            return []
+        return [self.find_element(by, value)]
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def execute_script(self, script, *args):
+        return None
+
+    def execute(self, driver_command, params=None):
+        # Only the W3C actions ActionChains performs; element methods never get here
+        if driver_command == Command.W3C_ACTIONS:
+            for device in params['actions']:
+                target = None
+                for action in device['actions']:
+                    origin = action.get('origin')
+                    if isinstance(origin, dict):
+                        target = next(iter(origin.values()))
+                    if action['type'] == 'pointerUp' and target is not None:
+                        self.clicks.append(target)
+        elif driver_command != Command.W3C_CLEAR_ACTIONS:
+            raise WebDriverException(f"FakeDriver does not implement {driver_command}")
+        return {'value': None}
+
+    def get_screenshot_as_base64(self):
+        # A 1x1 transparent PNG
+        return ("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
+
+    def get_log(self, log_type):
+        return []
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def add_cookie(self, cookie):
+        self.cookies.append(dict(cookie))
+
+    def delete_all_cookies(self):
+        self.cookies = []
+
+    def quit(self):
+        pass
@@ -0,0 +1,234 @@
+import os
+import tempfile
+import time
+import warnings
+from collections import deque
+from pathlib import Path
+from config.settings import (MAX_BROWSER_RSS_MB, MAX_BROWSER_HANDLES, MAX_STEPS_PER_SESSION,
+                             RESOURCE_SAMPLE_EVERY, MAX_SESSIONS_PER_HOST, SESSION_SLOT_TIMEOUT)
+from profiling import StepHook
+
+try:
+    import psutil
+except ImportError:  # In requirements.txt; without it only Linux (/proc) can sample the browser
+    psutil = None
+
+SESSION_SLOTS_DIR = Path(tempfile.gettempdir()) / "bugzero_sessions"
+
+def driver_pid(driver):
+    """PID of a local driver service (chromedriver, geckodriver...), None for remote/fake"""
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    return getattr(process, 'pid', None)
+
+def _proc_children():
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces, the parent PID follows its closing paren
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+def _proc_tree_usage(pid):
+    children = _proc_children()
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    rss, handles, pending = 0, 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                rss += int(f.read().split()[1]) * page_size
+            handles += len(os.listdir(f'/proc/{current}/fd'))
+        except (OSError, IndexError, ValueError):
+            continue
+    return rss, handles
+
+def process_tree_usage(pid):
+    """(rss_bytes, handle_count) of a process and all its descendants, or None"""
+    if pid is None:
+        return None
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            rss, handles = 0, 0
+            for process in [root] + root.children(recursive=True):
+                try:
+                    rss += process.memory_info().rss
+                    handles += process.num_handles() if os.name == 'nt' else process.num_fds()
+                except psutil.Error:
+                    continue
+            return rss, handles
+        except psutil.Error:
+            return None
+    if os.path.isdir('/proc'):
+        return _proc_tree_usage(pid)
+    return None
+
+def can_sample():
+    """Whether process_tree_usage works on this machine"""
+    return psutil is not None or os.path.isdir('/proc')
+
+class ResourceGovernor(StepHook):
+    """Watches the browser's process tree and decides when to recycle the session.
+
+    Samples memory and handle counts every RESOURCE_SAMPLE_EVERY steps; the
+    executor asks recycle_reason() at test case boundaries only, so a case
+    never loses its browser half way through.
+    """
+    MAX_SAMPLES = 500
+
+    def __init__(self, max_rss_mb=None, max_handles=None, max_steps=None, sample_every=None):
+        self.max_rss_mb = MAX_BROWSER_RSS_MB if max_rss_mb is None else max_rss_mb
+        self.max_handles = MAX_BROWSER_HANDLES if max_handles is None else max_handles
+        self.max_steps = MAX_STEPS_PER_SESSION if max_steps is None else max_steps
+        self.sample_every = sample_every or RESOURCE_SAMPLE_EVERY
+        self.samples = deque(maxlen=self.MAX_SAMPLES)
+        self.recycles = []
+        self.driver = None
+        self.session_steps = 0
+        if (self.max_rss_mb or self.max_handles) and not can_sample():
+            warnings.warn("psutil is not installed: browser memory and handle limits are not enforced, "
+                          "only MAX_STEPS_PER_SESSION")
+
+    def attach(self, driver):
+        """Start watching a (new) driver session"""
+        self.driver = driver
+        self.session_steps = 0
+
+    def after_step(self, index, step, result):
+        self.session_steps += 1
+        if self.session_steps % self.sample_every == 0:
+            self.sample()
+
+    def sample(self):
+        usage = process_tree_usage(driver_pid(self.driver))
+        if usage is None:
+            return None
+        rss, handles = usage
+        sample = {'time': time.time(), 'session_steps': self.session_steps,
+                  'rss_mb': round(rss / (1024 * 1024), 1), 'handles': handles}
+        self.samples.append(sample)
+        return sample
+
+    def recycle_reason(self):
+        """Why the session should be replaced now, or None"""
+        if self.max_steps and self.session_steps >= self.max_steps:
+            return f"{self.session_steps} steps in session"
+        sample = self.sample()
+        if sample and self.max_rss_mb and sample['rss_mb'] >= self.max_rss_mb:
+            return f"browser RSS {sample['rss_mb']} MB"
+        if sample and self.max_handles and sample['handles'] >= self.max_handles:
+            return f"{sample['handles']} open handles"
+        return None
+
+    def record_recycle(self, reason):
+        self.recycles.append({'time': time.time(), 'session_steps': self.session_steps, 'reason': reason})
+
+    def take_report(self):
+        """Samples and recycle events collected since the last call"""
+        report = {'samples': list(self.samples), 'recycles': self.recycles}
+        self.samples.clear()
+        self.recycles = []
+        return report
+
+def _pid_alive(pid):
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == 'nt':
+        # os.kill would send the process a CTRL_C_EVENT there instead of probing it
+        return _windows_pid_alive(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # Exists but belongs to someone else (or Windows semantics)
+    return True
+
+def _windows_pid_alive(pid):
+    import ctypes
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: exists, owned by someone else
+    try:
+        code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+            return True
+        return code.value == 259  # STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+def acquire_lock(path):
+    """Create the lock file path holding our PID; False while a live process holds it.
+
+    A lock left behind by a dead process is reclaimed.
+    """
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not _reclaim_stale(path):
+                return False
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+def release_lock(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _reclaim_stale(path):
+    try:
+        pid = int(Path(path).read_text() or 0)
+    except (OSError, ValueError):
+        return False
+    if pid and not _pid_alive(pid):
+        release_lock(path)
+        return True
+    return False
+
+class SessionSlot:
+    """Host-wide cap on concurrent browser sessions using lock files.
+
+    A slot is a file created exclusively in the temp directory and holding the
+    owner's PID; slots of dead processes are reclaimed.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def acquire(cls, max_sessions=None, poll=0.5, timeout=None):
+        """Wait for a free slot; TimeoutError after timeout seconds (SESSION_SLOT_TIMEOUT)"""
+        max_sessions = MAX_SESSIONS_PER_HOST if max_sessions is None else max_sessions
+        timeout = SESSION_SLOT_TIMEOUT if timeout is None else timeout
+        SESSION_SLOTS_DIR.mkdir(parents=True, exist_ok=True)
+        start = time.monotonic()
+        waiting = False
+        while True:
+            for i in range(max_sessions):
+                path = SESSION_SLOTS_DIR / f"slot-{i}.lock"
+                if acquire_lock(path):
+                    return cls(path)
+            if timeout and time.monotonic() - start >= timeout:
+                raise TimeoutError(f"No free browser session slot after {timeout}s: all {max_sessions} "
+                                   f"(MAX_SESSIONS_PER_HOST) are held; see the lock files in {SESSION_SLOTS_DIR}")
+            if not waiting:
+                print(f"Waiting for a session slot: all {max_sessions} are in use (lock files in "
+                      f"{SESSION_SLOTS_DIR})")
+                waiting = True
+            time.sleep(poll)
+
+    def release(self):
+        release_lock(self.path)
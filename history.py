@@ -0,0 +1,281 @@
+import argparse
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from config.settings import HISTORY_DB_PATH, HISTORY_WINDOW
+from profiling import StepHook
+from checkpoint import SETUP_CASE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    workbook TEXT NOT NULL,
+    started REAL NOT NULL,
+    report TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    workbook TEXT NOT NULL,
+    case_name TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    command TEXT,
+    line TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_case ON steps (workbook, case_name, run_id);
+CREATE INDEX IF NOT EXISTS steps_command ON steps (command, recorded);
+CREATE INDEX IF NOT EXISTS steps_recorded ON steps (recorded);
+"""
+
+ORDERS = ("failures", "longest")
+
+def connect(path=None):
+    path = Path(path or HISTORY_DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Suite workers write concurrently: WAL lets readers and one writer proceed together.
+    # Callers sharing a connection across threads (the distributed coordinator) lock around it
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class ResultsHistory(StepHook):
+    """StepHook writing every step's outcome and duration to the SQLite history.
+
+    Rows are buffered and inserted in one transaction per test case (or every
+    FLUSH_EVERY steps), so recording costs little next to the steps themselves.
+    """
+    FLUSH_EVERY = 200
+
+    def __init__(self, path=None):
+        self.conn = connect(path)
+        self.run_id = None
+        self.workbook = None
+        self.case = None
+        self.pending = []
+
+    def start_run(self, workbook):
+        self.flush()
+        self.workbook = str(Path(workbook).resolve())
+        with self.conn:
+            self.run_id = self.conn.execute("INSERT INTO runs (workbook, started) VALUES (?, ?)",
+                                            (self.workbook, time.time())).lastrowid
+        self.case = Path(workbook).stem
+        return self.run_id
+
+    def start_case(self, case):
+        self.flush()
+        self.case = case
+
+    def after_step(self, index, step, result):
+        if self.run_id is None:
+            return
+        self.pending.append((self.run_id, self.workbook, self.case, index + 1, step.command, step.line,
+                             int(result.passed), result.outcome, result.wall_time, time.time()))
+        if len(self.pending) >= self.FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self.pending)
+        self.pending = []
+
+    def finish_run(self, report_path=None):
+        self.flush()
+        if self.run_id is not None and report_path:
+            with self.conn:
+                self.conn.execute("UPDATE runs SET report = ? WHERE id = ?", (str(report_path), self.run_id))
+        self.run_id = None
+
+    def add_record(self, record, workbook=None):
+        """Store a finished runner record (e.g. one sent back by a remote worker) as a run"""
+        self.start_run(workbook or record['workbook'])
+        steps = zip(record['lines'], record['results'], record['commands'], record['durations'])
+        for index, (line, outcome, command, duration) in enumerate(steps):
+            self.pending.append((self.run_id, self.workbook, self.case, index + 1, command, line,
+                                 int(outcome == "PASS"), outcome, duration, time.time()))
+        self.finish_run()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+def _workbook_clause(workbook):
+    if workbook is None:
+        return "", ()
+    return " AND workbook = ?", (str(Path(workbook).resolve()),)
+
+def case_attempts(conn, workbook=None, window=None):
+    """{(workbook, case): [(passed, duration), ...]} of the latest runs, oldest first"""
+    window = window or HISTORY_WINDOW
+    clause, params = _workbook_clause(workbook)
+    rows = conn.execute(f"""
+        SELECT workbook, case_name, run_id, MIN(passed), SUM(duration) FROM steps
+        WHERE case_name != ?{clause}
+        GROUP BY workbook, case_name, run_id ORDER BY run_id""", (SETUP_CASE,) + params)
+    attempts = {}
+    for workbook_path, case, _, passed, duration in rows:
+        runs = attempts.setdefault((workbook_path, case), [])
+        runs.append((bool(passed), duration))
+        del runs[:-window]
+    return attempts
+
+def case_stats(conn, workbook=None, window=None):
+    """Failure rate, flakiness and mean duration per case over its latest runs.
+
+    Flakiness is the share of consecutive runs whose outcome flipped: 0 for a
+    case that always passes or always fails, 1 for one that alternates.
+    """
+    stats = []
+    for (workbook_path, case), runs in case_attempts(conn, workbook, window).items():
+        outcomes = [passed for passed, _ in runs]
+        flips = sum(a != b for a, b in zip(outcomes, outcomes[1:]))
+        stats.append({
+            'workbook': workbook_path, 'case': case, 'runs': len(runs),
+            'failure_rate': outcomes.count(False) / len(runs),
+            'flakiness': flips / (len(runs) - 1) if len(runs) > 1 else 0.0,
+            'mean_duration': sum(duration for _, duration in runs) / len(runs),
+            'last_passed': outcomes[-1],
+        })
+    return stats
+
+def duration_percentiles(conn, by='command', workbook=None, since=None, percentiles=(50, 90, 99)):
+    """Step duration percentiles grouped by command or by script line"""
+    column = {'command': 'command', 'line': 'line'}[by]
+    clause, params = _workbook_clause(workbook)
+    if since:
+        clause += " AND recorded >= ?"
+        params += (since,)
+    groups = {}
+    for key, duration in conn.execute(
+            f"SELECT {column}, duration FROM steps WHERE 1 = 1{clause} ORDER BY {column}, duration", params):
+        groups.setdefault(key or "(script line)", []).append(duration)
+    return [dict({by: key, 'count': len(values)},
+                 **{f"p{pct}": percentile(values, pct) for pct in percentiles})
+            for key, values in groups.items()]
+
+def trends(conn, days=7, workbook=None):
+    """Per day and command: step count, failure rate and mean duration"""
+    clause, params = _workbook_clause(workbook)
+    rows = conn.execute(f"""
+        SELECT date(recorded, 'unixepoch', 'localtime') AS day, command,
+               COUNT(*), 1.0 - AVG(passed), AVG(duration)
+        FROM steps WHERE recorded >= ?{clause}
+        GROUP BY day, command ORDER BY day, command""", (time.time() - days * 86400,) + params)
+    return [{'day': day, 'command': command or "(script line)", 'steps': count,
+             'failure_rate': failure_rate, 'mean_duration': mean}
+            for day, command, count, failure_rate, mean in rows]
+
+def slowdowns(conn, days=7, workbook=None, min_ratio=1.2):
+    """Steps whose mean duration in the last `days` grew by min_ratio over the period before"""
+    clause, params = _workbook_clause(workbook)
+    now = time.time()
+    recent, previous = now - days * 86400, now - 2 * days * 86400
+    rows = conn.execute(f"""
+        SELECT case_name, line,
+               AVG(CASE WHEN recorded >= ? THEN duration END),
+               AVG(CASE WHEN recorded < ? THEN duration END)
+        FROM steps WHERE recorded >= ?{clause}
+        GROUP BY case_name, line""", (recent, recent, previous) + params)
+    found = [{'case': case, 'line': line, 'recent': new, 'previous': old, 'ratio': new / old}
+             for case, line, new, old in rows if new is not None and old and new / old >= min_ratio]
+    return sorted(found, key=lambda row: row['ratio'], reverse=True)
+
+def _priority(runs, order):
+    if order == "failures":
+        # Recent failures weigh more; cases without history go first, they are the least known
+        if not runs:
+            return 2.0
+        weights = range(1, len(runs) + 1)
+        return sum(w for w, (passed, _) in zip(weights, runs) if not passed) / sum(weights)
+    if order == "longest":
+        return sum(duration for _, duration in runs) / len(runs) if runs else float('inf')
+    raise ValueError(f"Unknown order: {order} (choose from {', '.join(ORDERS)})")
+
+def order_cases(workbook, cases, order, conn=None):
+    """Sort case names by history: likely failures first, or longest first"""
+    if conn is None:
+        with closing(connect()) as conn:
+            return order_cases(workbook, cases, order, conn)
+    attempts = case_attempts(conn, workbook)
+    workbook = str(Path(workbook).resolve())
+    return sorted(cases, key=lambda case: _priority(attempts.get((workbook, case), []), order),
+                  reverse=True)
+
+def order_workbooks(workbooks, order, conn=None):
+    """Sort suite workbooks by history, each scored over all of its cases"""
+    if conn is None:
+        with closing(connect()) as conn:
+            return order_workbooks(workbooks, order, conn)
+    attempts = case_attempts(conn)
+    by_workbook = {}
+    for (workbook, _), runs in attempts.items():
+        by_workbook.setdefault(workbook, []).append(runs)
+
+    def score(path):
+        case_runs = by_workbook.get(str(Path(path).resolve()))
+        if not case_runs:
+            return _priority([], order)
+        scores = [_priority(runs, order) for runs in case_runs]
+        # A workbook takes as long as all its cases together, and fails if any case does
+        return sum(scores) if order == "longest" else max(scores)
+
+    return sorted(workbooks, key=score, reverse=True)
+
+def _print_table(rows):
+    if not rows:
+        print("No history")
+        return
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(column), *(len(r[i]) for r in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(r, widths)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the test results history")
+    parser.add_argument("--db", help="history database (defaults to settings.HISTORY_DB_PATH)")
+    parser.add_argument("--workbook", help="only results of this workbook")
+    commands = parser.add_subparsers(dest="query", required=True)
+    flaky = commands.add_parser("flaky", help="cases by flakiness score")
+    flaky.add_argument("--window", type=int, help="latest runs per case to consider")
+    durations = commands.add_parser("durations", help="step duration percentiles")
+    durations.add_argument("--by", choices=["command", "line"], default="command")
+    durations.add_argument("--days", type=float, help="only the last N days")
+    trend = commands.add_parser("trends", help="daily failure rate and duration per command")
+    trend.add_argument("--days", type=float, default=7)
+    slower = commands.add_parser("slower", help="steps that got slower than in the period before")
+    slower.add_argument("--days", type=float, default=7)
+    slower.add_argument("--ratio", type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    if args.query == "flaky":
+        stats = sorted(case_stats(conn, args.workbook, args.window),
+                       key=lambda row: (row['flakiness'], row['failure_rate']), reverse=True)
+        _print_table([{k: v for k, v in row.items() if k != 'workbook'} for row in stats])
+    elif args.query == "durations":
+        since = time.time() - args.days * 86400 if args.days else None
+        _print_table(duration_percentiles(conn, args.by, args.workbook, since))
+    elif args.query == "trends":
+        _print_table(trends(conn, args.days, args.workbook))
+    elif args.query == "slower":
+        _print_table(slowdowns(conn, args.days, args.workbook, args.ratio))
+
+if __name__ == "__main__":
+    main()
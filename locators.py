@@ -0,0 +1,287 @@
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from functools import lru_cache
+from config.settings import OPTIMIZE_XPATHS, LOCATOR_PROBE_REPEAT
+from profiling import StepHook
+
+# Locator cells may start with a strategy prefix; unprefixed locators are XPaths.
+# Prefix -> (attribute of selenium's By, its value)
+STRATEGIES = {
+    'id': ('ID', 'id'),
+    'css': ('CSS_SELECTOR', 'css selector'),
+    'name': ('NAME', 'name'),
+    'xpath': ('XPATH', 'xpath'),
+}
+PREFIXES = {by: prefix for prefix, (_, by) in STRATEGIES.items()}
+BY_VALUES = dict(STRATEGIES.values())
+LOCATOR_PREFIX = re.compile(r'^\s*(id|css|name|xpath)=(.*)$', re.DOTALL)
+
+# By.XPATH with a quoted placeholder in a translation table template
+XPATH_PLACEHOLDER = re.compile(r'By\.XPATH(,\s*)(["\'])\{(locator|value)\}\2')
+LOCATOR_BY = re.compile(r'By\.(ID|CSS_SELECTOR|NAME|XPATH),\s*["\']\{locator\}')
+
+# One step of a simple XPath: an element test with position predicates and attribute
+# predicates, e.g. [@type='text' and @name='q']
+XPATH_ATTRIBUTE = re.compile(r"""@(?P<attribute>[a-z][a-z0-9_-]*)(?:\s*=\s*(?P<value>'[^']*'|"[^"]*"))?""")
+XPATH_STEP = re.compile(r"""
+    (?P<axis>//?)
+    (?P<tag>\*|[a-z][a-z0-9-]*)
+    (?P<predicates>(?:\[(?:{attribute}(?:\s+and\s+{attribute})*|[1-9][0-9]*)\])*)
+""".format(attribute=XPATH_ATTRIBUTE.pattern.replace('?P<attribute>', '').replace('?P<value>', '')), re.VERBOSE)
+XPATH_PREDICATE = re.compile(r"""\[((?:'[^']*'|"[^"]*"|[^\]'"])*)\]""")
+CSS_IDENTIFIER = re.compile(r'^[A-Za-z_][\w-]*$')
+
+@lru_cache(maxsize=8192)
+def optimize_xpath(xpath):
+    """(prefix, selector) of an ID, name or CSS lookup equivalent to a simple XPath, or None.
+
+    Handles chains of element steps (`//`, `/`, absolute paths from /html)
+    with [@attr='value' and ...], [@attr] and leading [n] predicates, e.g.
+    //*[@id='center']/yt-searchbox/button -> css=#center > yt-searchbox > button.
+    Anything else (text(), contains(), axes, unions) stays an XPath.
+    """
+    xpath = xpath.strip()
+    steps = []
+    position = 0
+    while position < len(xpath):
+        match = XPATH_STEP.match(xpath, position)
+        if not match:
+            return None
+        steps.append(match)
+        position = match.end()
+    if not steps or (steps[0].group('axis') == '/' and steps[0].group('tag') != 'html'):
+        return None
+
+    if len(steps) == 1 and steps[0].group('axis') == '//' and steps[0].group('tag') == '*':
+        tests = list(XPATH_ATTRIBUTE.finditer(steps[0].group('predicates')))
+        if len(tests) == 1 and tests[0].group('attribute') in ('id', 'name') and tests[0].group('value'):
+            return tests[0].group('attribute'), tests[0].group('value')[1:-1]
+
+    selector = []
+    for number, step in enumerate(steps):
+        if number:
+            selector.append(' > ' if step.group('axis') == '/' else ' ')
+        tag = step.group('tag')
+        parts = [] if tag == '*' else [tag]
+        for index, predicate in enumerate(XPATH_PREDICATE.finditer(step.group('predicates'))):
+            if predicate.group(1).isdigit():
+                # [n] counts among the same tag (nth-of-type), or all elements for *; it only
+                # means the same in CSS before any attribute predicate narrowed the set
+                if index:
+                    return None
+                pseudo = 'nth-child' if tag == '*' else 'nth-of-type'
+                parts.append(f":{pseudo}({predicate.group(1)})")
+                continue
+            for test in XPATH_ATTRIBUTE.finditer(predicate.group(1)):
+                attribute, value = test.group('attribute'), test.group('value')
+                if value is None:
+                    parts.append(f"[{attribute}]")
+                elif attribute == 'id' and CSS_IDENTIFIER.match(value[1:-1]):
+                    parts.append(f"#{value[1:-1]}")
+                else:
+                    # The XPath quotes are kept, so the selector fits the template's string literal too
+                    parts.append(f"[{attribute}={value}]")
+        selector.append(''.join(parts) or '*')
+    return 'css', ''.join(selector)
+
+@lru_cache(maxsize=8192)
+def locator_strategy(locator):
+    """(By attribute, selector) for a Locator cell, e.g. ('CSS_SELECTOR', '#main')"""
+    match = LOCATOR_PREFIX.match(locator)
+    if match:
+        return STRATEGIES[match.group(1)][0], match.group(2)
+    if OPTIMIZE_XPATHS:
+        optimized = optimize_xpath(locator)
+        if optimized:
+            return STRATEGIES[optimized[0]][0], optimized[1]
+    return 'XPATH', locator
+
+def apply_strategy(template, locator='', value=''):
+    """(template, locator, value) with locator prefixes and optimized XPaths applied.
+
+    A template's By.XPATH before a quoted {locator} (or {value}, as in
+    DragAndDrop) becomes the strategy the cell asks for, and the cell loses
+    its prefix. Other templates are returned unchanged.
+    """
+    if 'By.XPATH' not in template:
+        return template, locator, value
+    cells = {'locator': locator, 'value': value}
+
+    def replace(match):
+        name = match.group(3)
+        if not isinstance(cells[name], str):
+            return match.group()
+        strategy, cells[name] = locator_strategy(cells[name])
+        return f"By.{strategy}{match.group(1)}{match.group(2)}{{{name}}}{match.group(2)}"
+
+    template = XPATH_PLACEHOLDER.sub(replace, template)
+    return template, cells['locator'], cells['value']
+
+@lru_cache(maxsize=1024)
+def locator_by(template):
+    """By value of a (strategy applied) template's {locator} lookup, or None"""
+    match = LOCATOR_BY.search(template)
+    return BY_VALUES[match.group(1)] if match else None
+
+def prefixed(by, selector):
+    """Locator cell text for a lookup; XPaths are written without prefix"""
+    return selector if by == 'xpath' else f"{PREFIXES[by]}={selector}"
+
+CANDIDATES_SCRIPT = """
+var element = arguments[0], found = [];
+function unique(selector) {
+    try { return document.querySelectorAll(selector).length === 1; } catch (e) { return false; }
+}
+if (element.id && unique('#' + CSS.escape(element.id))) found.push(['id', element.id]);
+var name = element.getAttribute('name');
+if (name && document.getElementsByName(name).length === 1) found.push(['name', name]);
+['data-testid', 'data-test', 'data-qa', 'aria-label'].forEach(function (attribute) {
+    var value = element.getAttribute(attribute);
+    if (value === null) return;
+    var selector = element.tagName.toLowerCase() + '[' + attribute + "='" +
+                   value.replace(/(['\\\\])/g, '\\\\$1') + "']";
+    if (unique(selector)) found.push(['css selector', selector]);
+});
+return found;
+"""
+
+# Lookups by these survive layout changes best; structural paths break first
+STABILITY = {'id': 3, 'name': 2, 'css selector': 1, 'xpath': 0}
+
+class LocatorProbe(StepHook):
+    """Times alternative lookups of each step's element against the live page.
+
+    Before a step runs, the element its locator finds is looked up again by
+    the candidates: its ID and name when unique on the page, CSS selectors
+    from test id attributes and the optimizer's rewrite of the XPath. Each is
+    timed LOCATOR_PROBE_REPEAT times (median). A candidate is suggested when
+    it finds exactly that element and is more stable, or as stable and faster.
+    """
+    def __init__(self, repeat=None):
+        self.repeat = repeat or LOCATOR_PROBE_REPEAT
+        self.driver = None
+        self.findings = {}  # (by, locator) -> finding, each locator is measured once
+
+    def attach(self, driver):
+        self.driver = driver
+
+    def before_step(self, index, step):
+        locator = step.params.get('_locator')
+        if self.driver is None or not step.by or locator is None or (step.by, locator) in self.findings:
+            return
+        try:
+            elements = self.driver.find_elements(step.by, locator)
+        except Exception:
+            return
+        if not elements:
+            return  # Not on the page yet; the step's own wait takes care of it
+        target = elements[0]
+        candidates = [(step.by, locator)]
+        if step.by == 'xpath':
+            optimized = optimize_xpath(locator)
+            if optimized:
+                candidates.append((STRATEGIES[optimized[0]][1], optimized[1]))
+        try:
+            candidates.extend(tuple(pair) for pair in self.driver.execute_script(CANDIDATES_SCRIPT, target) or [])
+        except Exception:
+            pass
+
+        timings = []
+        for by, selector in dict.fromkeys(candidates):
+            timing = self._time(by, selector, target)
+            if timing:
+                timings.append(dict(timing, locator=prefixed(by, selector), by=by))
+        if not timings:
+            return
+        current = timings[0]
+        stable = [t for t in timings if t['matches'] == 1 and t['same']]
+        best = min(stable, key=lambda t: (-STABILITY[t['by']], t['ms'])) if stable else current
+        self.findings[(step.by, locator)] = {
+            'command': step.command, 'locator': current['locator'], 'ms': current['ms'],
+            'matches': current['matches'],
+            'suggestion': best['locator'] if best is not current else None,
+            'suggestion_ms': best['ms'] if best is not current else None,
+            'candidates': [{k: t[k] for k in ('locator', 'ms', 'matches', 'same')} for t in timings],
+        }
+
+    def _time(self, by, selector, target):
+        durations = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            try:
+                elements = self.driver.find_elements(by, selector)
+            except Exception:
+                return None
+            durations.append(time.perf_counter() - start)
+        return {'ms': round(statistics.median(durations) * 1000, 3), 'matches': len(elements),
+                'same': bool(elements) and elements[0] == target}
+
+def measure(path, backend=None, browser=None, profile=None, repeat=None):
+    """Run a workbook with a LocatorProbe and return its findings, slowest locator first"""
+    from compiler import compile_testcase
+    from executor import TestExecutor
+    from runner import driver_options
+    from utils import load_translation_table, load_testcase
+
+    plan = compile_testcase(load_testcase(path), load_translation_table())
+    probe = LocatorProbe(repeat)
+    executor = TestExecutor(hooks=[probe], **driver_options(path, backend, browser, profile))
+    try:
+        for _ in executor.iter_plan(plan):
+            pass
+    finally:
+        executor.close()
+    return sorted(probe.findings.values(), key=lambda finding: finding['ms'], reverse=True)
+
+def rewrites(path):
+    """(step, locator, rewrite) of the workbook's XPaths the optimizer replaces"""
+    from utils import load_testcase
+
+    found = []
+    for row in load_testcase(path).to_dict('records'):
+        locator = row.get('Locator', '')
+        if isinstance(locator, str) and not LOCATOR_PREFIX.match(locator):
+            optimized = optimize_xpath(locator)
+            if optimized:
+                found.append((row.get('Step'), locator, f"{optimized[0]}={optimized[1]}"))
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimize and measure test case locators")
+    commands = parser.add_subparsers(dest="action", required=True)
+    rewrite = commands.add_parser("rewrite", help="list the XPaths replaced by ID/CSS lookups at generation time")
+    rewrite.add_argument("test_case")
+    probe = commands.add_parser("measure", help="time locator strategies against the live page")
+    probe.add_argument("test_case")
+    probe.add_argument("--driver", choices=["selenium", "fake"], help="driver backend")
+    probe.add_argument("--browser", help="chrome, firefox or edge")
+    probe.add_argument("--profile", help="driver profile from settings.DRIVER_PROFILES")
+    probe.add_argument("--repeat", type=int, help="lookups per candidate")
+    probe.add_argument("--output", metavar="PATH", help="write the findings as JSON")
+    args = parser.parse_args(argv)
+
+    if args.action == "rewrite":
+        for step, locator, optimized in rewrites(args.test_case):
+            print(f"Step {step}: {locator}  ->  {optimized}")
+        return
+
+    findings = measure(args.test_case, args.driver, args.browser, args.profile, args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(findings, f, indent=2)
+    for finding in findings:
+        line = f"{finding['ms']:8.3f} ms  {finding['locator']}"
+        if finding['matches'] != 1:
+            line += f"  ({finding['matches']} matches)"
+        if finding['suggestion']:
+            line += f"\n            -> {finding['suggestion']} ({finding['suggestion_ms']:.3f} ms)"
+        print(line)
+    if not findings:
+        print("No locators could be measured", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,35 @@
 from pathlib import Path
 from datetime import datetime
+import html
+import json
 import webbrowser
-from config.settings import REPORTS_DIR
+from config.settings import REPORTS_DIR, REPORT_PROGRESS_EVERY, ARTIFACTS_DIR
+from profiling import LatencyHistogram
+
+# Extra columns of a profiled report, filled from profiling.StepResult timings
+TIMING_COLUMNS = ["Wall (s)", "CPU (s)", "Driver (s)", "Lookups", "Wait (s)"]
+
+STYLE = """
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                table { border-collapse: collapse; width: 100%; margin-top: 20px; }
+                th, td { padding: 10px; text-align: left; border: 1px solid #ddd; }
+                th { background-color: #f2f2f2; }
+                .pass { background-color: #e8f5e9; }
+                .fail { background-color: #ffebee; }
+                code { background: #f5f5f5; padding: 2px 5px; white-space: pre-wrap; }
+                .summary { margin: 20px 0; padding: 15px; background: #e3f2fd; }
+                .group td { background: #eceff1; font-weight: bold; }
+            </style>"""
 
 class HTMLReportGenerator:
     @staticmethod
-    def generate_report(script_lines, results, filename=None):
+    def generate_report(script_lines, results, filename=None, resources=None):
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         filename = filename or f"test_report_{timestamp}.html"
         report_path = REPORTS_DIR / filename
         
-        html_content = HTMLReportGenerator._build_html(script_lines, results)
+        html_content = HTMLReportGenerator._build_html(script_lines, results, resources)
         
         with open(report_path, 'w', encoding='utf-8') as f:
             f.write(html_content)
@@ -19,45 +38,260 @@ class HTMLReportGenerator:
         return str(report_path)
 
     @staticmethod
-    def _build_html(script_lines, results):
-        rows = []
-        for i, (line, result) in enumerate(zip(script_lines, results), 1):
-            status = "PASS" if "PASS" in result else "FAIL"
-            rows.append(f"""
+    def generate_suite_report(records, filename=None):
+        """Merge the records of runner.run_suite into a single report"""
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        filename = filename or f"suite_report_{timestamp}.html"
+        report_path = REPORTS_DIR / filename
+
+        html_content = HTMLReportGenerator._build_suite_html(records)
+
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+
+        webbrowser.open(f"file://{report_path.absolute()}")
+        return str(report_path)
+
+    @staticmethod
+    def _table_header(profiled=False):
+        timing = ''.join(f"<th>{column}</th>" for column in TIMING_COLUMNS) if profiled else ""
+        return f"<tr><th>Step</th><th>Command</th><th>Result</th>{timing}</tr>"
+
+    @staticmethod
+    def _artifact_links(artifacts):
+        """Links from a report in REPORTS_DIR to a step's artifacts.ArtifactCapture files"""
+        try:
+            base = ARTIFACTS_DIR.relative_to(REPORTS_DIR).as_posix()
+        except ValueError:
+            base = ARTIFACTS_DIR.absolute().as_uri()
+        links = ' '.join(f"<a href='{base}/{path}'>{kind}</a>" for kind, path in artifacts.items())
+        return f"<br>{links}" if links else ""
+
+    @staticmethod
+    def _build_row(i, line, result, profiled=False):
+        # result is a result string or a profiling.StepResult carrying timings;
+        # under a profiled header, string results get empty timing cells
+        outcome = str(result)
+        status = "PASS" if "PASS" in outcome else "FAIL"
+        links = HTMLReportGenerator._artifact_links(getattr(result, 'artifacts', None) or {})
+        timing = ""
+        if hasattr(result, 'wall_time'):
+            timing = f"""
+                    <td>{result.wall_time:.3f}</td>
+                    <td>{result.cpu_time:.3f}</td>
+                    <td>{result.driver_time:.3f}</td>
+                    <td>{result.lookups}</td>
+                    <td>{result.wait_time:.3f}</td>"""
+        elif profiled:
+            timing = "<td></td>" * len(TIMING_COLUMNS)
+        return f"""
                 <tr class='{status.lower()}'>
                     <td>{i}</td>
-                    <td><code>{line}</code></td>
-                    <td>{result}</td>
+                    <td><code>{html.escape(line)}</code></td>
+                    <td>{html.escape(outcome)}{links}</td>{timing}
                 </tr>
+            """
+
+    @staticmethod
+    def _build_histogram(histogram):
+        """Per-command latency table from a profiling.LatencyHistogram"""
+        # The last bucket is open ended
+        labels = [f"&le; {bound:g}s" for bound in histogram.buckets[:-1]]
+        labels.append(f"&gt; {histogram.buckets[-2]:g}s")
+        bounds = ''.join(f"<th>{label}</th>" for label in labels)
+        rows = []
+        for command, counts in sorted(histogram.counts.items()):
+            total = sum(counts)
+            cells = ''.join(f"<td>{count or ''}</td>" for count in counts)
+            rows.append(f"""
+                <tr>
+                    <td>{html.escape(command)}</td><td>{total}</td>
+                    <td>{histogram.totals[command] / total:.3f}</td>{cells}
+                </tr>""")
+        return f"""
+            <h2>Latency by Command</h2>
+            <table>
+                <tr><th>Command</th><th>Steps</th><th>Mean (s)</th>{bounds}</tr>
+                {''.join(rows)}
+            </table>"""
+
+    @staticmethod
+    def _build_resources(resources):
+        """Browser recycles and resource samples from governor.ResourceGovernor.take_report"""
+        if not resources or not (resources['samples'] or resources['recycles']):
+            return ""
+        recycles = ''.join(f"""
+                <tr>
+                    <td>{datetime.fromtimestamp(event['time']).strftime('%H:%M:%S')}</td>
+                    <td>{event['session_steps']}</td><td>{html.escape(event['reason'])}</td>
+                </tr>""" for event in resources['recycles'])
+        samples = ''.join(f"""
+                <tr>
+                    <td>{datetime.fromtimestamp(sample['time']).strftime('%H:%M:%S')}</td>
+                    <td>{sample['session_steps']}</td><td>{sample['rss_mb']}</td><td>{sample['handles']}</td>
+                </tr>""" for sample in resources['samples'])
+        return f"""
+            <h2>Browser Resources</h2>
+            <p><strong>Recycles:</strong> {len(resources['recycles'])}</p>
+            <table>
+                <tr><th>Time</th><th>Session Steps</th><th>Reason</th></tr>
+                {recycles}
+            </table>
+            <table>
+                <tr><th>Time</th><th>Session Steps</th><th>RSS (MB)</th><th>Handles</th></tr>
+                {samples}
+            </table>"""
+
+    @staticmethod
+    def _build_groups(groups):
+        """Per-iteration totals of a data-driven run, from [title, total, passed] entries"""
+        if not groups:
+            return ""
+        rows = ''.join(f"""
+                <tr class='{"pass" if passed == total else "fail"}'>
+                    <td>{html.escape(title)}</td><td>{total}</td><td>{passed}</td><td>{total - passed}</td>
+                </tr>""" for title, total, passed in groups)
+        return f"""
+            <h2>Iterations</h2>
+            <table>
+                <tr><th>Iteration</th><th>Steps</th><th>Passed</th><th>Failed</th></tr>
+                {rows}
+            </table>"""
+
+    @staticmethod
+    def _build_rows(script_lines, results):
+        return [HTMLReportGenerator._build_row(i, line, result)
+                for i, (line, result) in enumerate(zip(script_lines, results), 1)]
+
+    @staticmethod
+    def _build_suite_html(records):
+        sections = []
+        results = []
+        for record in records:
+            results.extend(record['results'])
+            if record['error']:
+                results.append(f"FAIL: {record['error']}")
+            failed = record['error'] or any("FAIL" in r for r in record['results'])
+            error = f"<p class='fail'>{html.escape(record['error'])}</p>" if record['error'] else ""
+            sections.append(f"""
+            <h2 class='{"fail" if failed else "pass"}'>{html.escape(record['workbook'])}</h2>
+            {error}
+            <table>
+                {HTMLReportGenerator._table_header()}
+                {''.join(HTMLReportGenerator._build_rows(record['lines'], record['results']))}
+            </table>
+            {HTMLReportGenerator._build_resources(record.get('resources'))}
             """)
-            
+
+        return HTMLReportGenerator._wrap_html(
+            f"<strong>Workbooks:</strong> {len(records)}<br>", results, ''.join(sections))
+
+    @staticmethod
+    def _build_html(script_lines, results, resources=None):
+        rows = HTMLReportGenerator._build_rows(script_lines, results)
+        profiled = any(hasattr(result, 'wall_time') for result in results)
+        body = f"""
+            <table>
+                {HTMLReportGenerator._table_header(profiled)}
+                {''.join(rows)}
+            </table>"""
+        if profiled:
+            body += HTMLReportGenerator._build_histogram(LatencyHistogram.from_results(results))
+        body += HTMLReportGenerator._build_resources(resources)
+        return HTMLReportGenerator._wrap_html("", results, body)
+
+    @staticmethod
+    def _build_summary(total, passed, extra_summary=""):
+        return f"""
+            <div class="summary">
+                <strong>Execution Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br>
+                {extra_summary}
+                <strong>Total Tests:</strong> {total}<br>
+                <strong>Passed:</strong> {passed}<br>
+                <strong>Failed:</strong> {total - passed}
+            </div>"""
+
+    @staticmethod
+    def _wrap_html(extra_summary, results, body):
+        passed = sum(1 for r in results if "PASS" in str(r))
         return f"""
         <html>
         <head>
-            <title>Test Execution Report</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                table {{ border-collapse: collapse; width: 100%; margin-top: 20px; }}
-                th, td {{ padding: 10px; text-align: left; border: 1px solid #ddd; }}
-                th {{ background-color: #f2f2f2; }}
-                .pass {{ background-color: #e8f5e9; }}
-                .fail {{ background-color: #ffebee; }}
-                code {{ background: #f5f5f5; padding: 2px 5px; }}
-                .summary {{ margin: 20px 0; padding: 15px; background: #e3f2fd; }}
-            </style>
+            <title>Test Execution Report</title>{STYLE}
+        </head>
+        <body>
+            <h1>Test Execution Report</h1>{HTMLReportGenerator._build_summary(len(results), passed, extra_summary)}
+            {body}
+        </body>
+        </html>
+        """
+
+class StreamingHTMLReport:
+    """Report written row by row while the run is in progress.
+
+    The header and table open are written up front, every add_row is flushed
+    to disk and close() appends the summary as a footer, so memory stays
+    constant and an interrupted run still leaves a readable page. A sidecar
+    <report>.json holds the running counts for tools that poll progress.
+    Rows take profiling.StepResult objects; their timings fill the extra
+    columns and the per-command latency histogram in the footer.
+    """
+    def __init__(self, filename=None):
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        filename = filename or f"test_report_{timestamp}.html"
+        self.path = REPORTS_DIR / filename
+        self.summary_path = self.path.with_suffix('.json')
+        self.total = 0
+        self.passed = 0
+        self.histogram = LatencyHistogram()
+        self.groups = []
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(f"""
+        <html>
+        <head>
+            <title>Test Execution Report</title>{STYLE}
         </head>
         <body>
             <h1>Test Execution Report</h1>
-            <div class="summary">
-                <strong>Execution Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br>
-                <strong>Total Tests:</strong> {len(results)}<br>
-                <strong>Passed:</strong> {sum(1 for r in results if "PASS" in r)}<br>
-                <strong>Failed:</strong> {sum(1 for r in results if "FAIL" in r)}
-            </div>
             <table>
-                <tr><th>Step</th><th>Command</th><th>Result</th></tr>
-                {''.join(rows)}
-            </table>
+                {HTMLReportGenerator._table_header(profiled=True)}""")
+        self._file.flush()
+
+    def add_row(self, line, result):
+        self.total += 1
+        passed = "PASS" in str(result)
+        self.passed += passed
+        if self.groups:
+            self.groups[-1][1] += 1
+            self.groups[-1][2] += passed
+        if hasattr(result, 'wall_time'):
+            self.histogram.add(result.command, result.wall_time)
+        self._file.write(HTMLReportGenerator._build_row(self.total, line, result, profiled=True))
+        self._file.flush()
+        if self.total % REPORT_PROGRESS_EVERY == 0:
+            self._write_summary(finished=False)
+
+    def start_group(self, title):
+        """Start a titled group of rows, e.g. one iteration of a data-driven run"""
+        self.groups.append([title, 0, 0])
+        self._file.write(f"""
+                <tr class='group'><td colspan='{3 + len(TIMING_COLUMNS)}'>{html.escape(title)}</td></tr>""")
+        self._file.flush()
+
+    def _write_summary(self, finished):
+        with open(self.summary_path, 'w', encoding='utf-8') as f:
+            json.dump({'total': self.total, 'passed': self.passed,
+                       'failed': self.total - self.passed, 'finished': finished}, f)
+
+    def close(self, open_browser=True, resources=None):
+        """Write the summary footer and return the report path"""
+        self._file.write(f"""
+            </table>{HTMLReportGenerator._build_groups(self.groups)}{HTMLReportGenerator._build_histogram(self.histogram)}{HTMLReportGenerator._build_resources(resources)}{HTMLReportGenerator._build_summary(self.total, self.passed)}
         </body>
         </html>
-        """
+        """)
+        self._file.close()
+        self._write_summary(finished=True)
+        if open_browser:
+            webbrowser.open(f"file://{self.path.absolute()}")
+        return str(self.path)
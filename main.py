@@ -1,29 +1,273 @@
-from utils import load_translation_table, load_testcase, generate_code_from_testcase
-from executor import TestExecutor
-from logger import HTMLReportGenerator
+from utils import load_translation_table, load_testcase, split_test_cases
+from checkpoint import RunJournal, SETUP_CASE, find_journal, plan_cases, stream_cases
+from datadriven import data_references, resolve_dataset, iter_dataset, iter_iterations
+from config.settings import (DEFAULT_TESTCASE_PATH, DRIVER_PROFILES, HISTORY_ENABLED, VALIDATE_BEFORE_RUN,
+                             SHARE_PREFIXES)
+from executor import TestExecutor, reset_driver
+from history import ResultsHistory, ORDERS, order_cases
+from validator import validate_testcase, validate_workbooks, format_issues
+from prefixes import run_shared
+from logger import HTMLReportGenerator, StreamingHTMLReport
+from profiling import export_results
+from runner import discover_workbooks, run_suite, driver_options
+from distributed import run_distributed, run_worker
+from datetime import datetime
+from pathlib import Path
+import argparse
 import sys
 
-def main(test_case_path=None):
+def main(test_case_path=None, backend=None, stream=False, metrics_path=None,
+         resume=None, rerun_failed=None, browser=None, profile=None, data=None,
+         sheets=None, names=None, tags=None, order=None, share_prefixes=None):
+    executor = None
+    journal = None
+    history = None
     try:
         # Load test data
         translation_table = load_translation_table()
-        testcase_df = load_testcase(test_case_path)
-        
-        # Generate and execute test script
-        executor = TestExecutor()
-        script_lines = generate_code_from_testcase(testcase_df, translation_table)
-        results = executor.execute_script(script_lines)
+        report_name = f"test_report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+        only, skip, previous_steps = None, [], []
+        selection = None
+        if sheets or names or tags:
+            selection = {'sheets': sheets, 'names': names, 'tags': tags}
+        if resume:
+            # Finished cases are kept from the journal, the rest run again after the setup
+            journal = RunJournal(find_journal(resume))
+            test_case_path = journal.workbook
+            selection = journal.selection
+            data = journal.restore_data(data)
+            skip = journal.finished_cases()
+            previous_steps = journal.case_steps(skip)
+            journal.resume()
+        elif rerun_failed:
+            previous = RunJournal(find_journal(rerun_failed))
+            test_case_path = previous.workbook
+            selection = previous.selection
+            data = previous.restore_data(data)
+            only = previous.failed_cases()
+            if not only:
+                print("No failed test cases to re-run")
+                return
+        if selection and order:
+            raise ValueError("--order can't be combined with --sheet/--case/--tag: "
+                             "selected cases run as they are read")
+        test_case_path = Path(test_case_path or DEFAULT_TESTCASE_PATH)
+        testcase_df = None if selection else load_testcase(test_case_path)
+        if VALIDATE_BEFORE_RUN and testcase_df is not None:
+            # Fail before paying for a browser; streamed selections are checked case by case
+            errors = [dict(issue, workbook=str(test_case_path))
+                      for issue in validate_testcase(testcase_df, translation_table)
+                      if issue['severity'] == 'error']
+            if errors:
+                raise ValueError("Validation failed:\n" + "\n".join(format_issues(errors)))
+
+        # Each re-run failed case gets the setup steps it depends on and a clean browser
+        share_prefixes = SHARE_PREFIXES if share_prefixes is None else share_prefixes
+        shared = False
+        if selection:
+            # Selected sheets/cases are read, checked and run one case at a time, grouped by sheet
+            iterations = stream_cases(test_case_path, translation_table, **selection,
+                                      only=only, skip=skip, isolate=bool(rerun_failed),
+                                      data=data, validate=VALIDATE_BEFORE_RUN)
+            stream = True
+        elif data_references(testcase_df):
+            # Data-driven: expanded and compiled one dataset row at a time, and
+            # streamed to the report so memory stays flat for large datasets
+            rows = iter_dataset(*resolve_dataset(test_case_path, data))
+            iterations = iter_iterations(testcase_df, test_case_path.stem, translation_table, rows,
+                                         only=only, skip=skip, isolate=bool(rerun_failed))
+            stream = True
+        else:
+            setup_df, cases = split_test_cases(testcase_df, test_case_path.stem)
+            if order:
+                ranked = order_cases(test_case_path, [name for name, _ in cases], order)
+                cases = sorted(cases, key=lambda case: ranked.index(case[0]))
+            # With shared prefixes cases are independent too, but common steps run once
+            shared = share_prefixes
+            iterations = [(None, plan_cases(setup_df, cases, translation_table, only=only, skip=skip,
+                                            isolate=bool(rerun_failed) or shared), False)]
+        journal = journal or RunJournal.create(test_case_path, name=report_name, selection=selection,
+                                                data=data)
         
+        # Execute test cases, journaling every step
+        options = driver_options(test_case_path, backend, browser, profile)
+        hooks = [journal]
+        if HISTORY_ENABLED:
+            history = ResultsHistory()
+            history.start_run(test_case_path)
+            hooks.append(history)
+        # Shared steps belong to several cases, so they are journaled once each case completes
+        executor = TestExecutor(hooks=[] if shared else hooks, **options)
+        report = None
+        if stream:
+            # Rows are written as steps finish so a crash keeps the partial report
+            report = StreamingHTMLReport(f"{report_name}.html")
+            print(f"Streaming report to: {report.path}")
+        script_lines, results = [], []
+        for line, outcome in previous_steps:
+            if report:
+                report.add_row(line, outcome)
+            else:
+                script_lines.append(line)
+                results.append(outcome)
+
+        def add_row(step, result):
+            if report:
+                report.add_row(step.line, result)
+            else:
+                script_lines.append(step.line)
+            if not report or metrics_path:
+                results.append(result)
+
+        def run_segment(case, plan):
+            journal.start_case(case)
+            if history:
+                history.start_case(case)
+            for step, result in executor.iter_plan(plan):
+                add_row(step, result)
+            journal.end_case()
+
+        def record_case(case, steps):
+            for hook in hooks:
+                hook.start_case(case)
+            for index, (step, result) in enumerate(steps):
+                for hook in hooks:
+                    hook.after_step(index, step, result)
+                add_row(step, result)
+            journal.end_case()
+
+        setup_plan = None
+        started = False
+        resources = None
+        try:
+            if shared:
+                for case, steps in run_shared(executor, iterations[0][1]):
+                    record_case(case, steps)
+                iterations = []
+            # fresh marks dataset iterations, which start from a reset browser like re-run cases
+            for label, segments, fresh in iterations:
+                if label:
+                    report.start_group(label)
+                for case, plan in segments:
+                    if case == SETUP_CASE:
+                        setup_plan = plan
+                    if started and executor.maybe_recycle():
+                        # A fresh browser needs the shared setup again before the next case
+                        if setup_plan and case != SETUP_CASE and not rerun_failed:
+                            run_segment(SETUP_CASE, setup_plan)
+                    elif started and (rerun_failed or fresh):
+                        reset_driver(executor.driver)
+                    fresh = False
+                    run_segment(case, plan)
+                    started = True
+        finally:
+            if executor.governor:
+                resources = executor.governor.take_report()
+            if report:
+                report_path = report.close(resources=resources)
+
         # Generate report
-        report_path = HTMLReportGenerator.generate_report(script_lines, results)
+        if not report:
+            report_path = HTMLReportGenerator.generate_report(script_lines, results, f"{report_name}.html",
+                                                              resources=resources)
+        journal.finish(report_path)
+        if history:
+            history.finish_run(report_path)
         print(f"Report generated at: {report_path}")
+        if metrics_path:
+            profiled = [result for result in results if hasattr(result, 'wall_time')]
+            print(f"Step metrics written to: {export_results(profiled, metrics_path)}")
         
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
+        if journal:
+            print(f"Resume with: python main.py --resume {journal.path}", file=sys.stderr)
         sys.exit(1)
         
     finally:
-        executor.close()
+        if journal:
+            journal.close()
+        if history:
+            history.close()
+        if executor:
+            executor.close()
+
+def main_suite(pattern, workers=None, backend=None, browser=None, profile=None, order=None,
+               coordinator=None, token=None):
+    try:
+        workbooks = discover_workbooks(pattern)
+        if VALIDATE_BEFORE_RUN:
+            validation = validate_workbooks(workbooks, jobs=workers or 1)
+            if validation['errors']:
+                errors = [issue for issue in validation['issues'] if issue['severity'] == 'error']
+                raise ValueError(f"Validation failed for {len(validation['failed_workbooks'])} "
+                                 f"workbook(s):\n" + "\n".join(format_issues(errors)))
+        if coordinator:
+            # Workbooks go to worker nodes; --workers starts that many on this machine too
+            host, _, port = coordinator.rpartition(':')
+            _, report_path = run_distributed(workbooks, host or None, int(port), token=token,
+                                             local_workers=workers or 0, backend=backend,
+                                             browser=browser, profile=profile)
+        else:
+            records = run_suite(workbooks, workers=workers, backend=backend,
+                                browser=browser, profile=profile, order=order)
+            report_path = HTMLReportGenerator.generate_suite_report(records)
+        print(f"Report generated at: {report_path}")
+
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run Selenium test cases from Excel workbooks")
+    parser.add_argument("test_case", nargs="?", help="test case workbook (defaults to test_cases.xlsx)")
+    parser.add_argument("--suite", metavar="PATTERN",
+                        help="directory or glob of workbooks to run in parallel")
+    parser.add_argument("--workers", type=int, help="number of worker processes for --suite")
+    parser.add_argument("--coordinator", metavar="[HOST:]PORT",
+                        help="with --suite, hand workbooks to worker nodes connecting on this port")
+    parser.add_argument("--worker", metavar="URL",
+                        help="run as a worker node of the coordinator at URL (http://host:port)")
+    parser.add_argument("--token", help="shared coordinator/worker secret (defaults to $BUGZERO_TOKEN)")
+    parser.add_argument("--driver", choices=["selenium", "fake"],
+                        help="driver backend (fake runs without a browser)")
+    parser.add_argument("--browser", choices=["chrome", "firefox", "edge"],
+                        help="browser to drive (defaults to settings.BROWSER)")
+    parser.add_argument("--profile", choices=sorted(DRIVER_PROFILES),
+                        help="browser performance profile from settings.DRIVER_PROFILES")
+    parser.add_argument("--data", metavar="DATASET",
+                        help="dataset for ${column} references: a .csv, a workbook or workbook.xlsx#Sheet")
+    parser.add_argument("--sheet", action="append", dest="sheets", metavar="NAME",
+                        help="run test cases from this sheet (repeatable, wildcards allowed, '*' for all)")
+    parser.add_argument("--case", action="append", dest="names", metavar="NAME",
+                        help="run only test cases with this name (repeatable, wildcards allowed)")
+    parser.add_argument("--tag", action="append", dest="tags",
+                        help="run only test cases tagged with this in their Tags column (repeatable)")
+    parser.add_argument("--share-prefixes", action="store_true", default=None,
+                        help="run test cases independently, executing their common leading steps once")
+    parser.add_argument("--order", choices=ORDERS,
+                        help="order test cases (or suite workbooks) by results history: "
+                             "likely failures first or longest first")
+    parser.add_argument("--stream", action="store_true",
+                        help="write the report row by row while the run is in progress")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="export per-step timings to a .json or .csv file")
+    parser.add_argument("--resume", metavar="JOURNAL",
+                        help="continue an interrupted run from its journal (or report)")
+    parser.add_argument("--rerun-failed", metavar="REPORT",
+                        help="re-run only the failed test cases of a previous report (or journal)")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.worker:
+        run_worker(args.worker, args.driver, args.browser, args.profile, token=args.token)
+    elif args.suite:
+        main_suite(args.suite, args.workers, args.driver, args.browser, args.profile, args.order,
+                   args.coordinator, args.token)
+    else:
+        main(args.test_case, backend=args.driver, stream=args.stream, metrics_path=args.metrics,
+             resume=args.resume, rerun_failed=args.rerun_failed,
+             browser=args.browser, profile=args.profile, data=args.data,
+             sheets=args.sheets, names=args.names, tags=args.tags, order=args.order,
+             share_prefixes=args.share_prefixes)
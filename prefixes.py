@@ -0,0 +1,133 @@
+from config.settings import SNAPSHOT_UNSAFE_COMMANDS
+from executor import reset_driver
+
+STORAGE_SCRIPT = """
+return [JSON.stringify(Object.entries(window.localStorage)),
+        JSON.stringify(Object.entries(window.sessionStorage))];
+"""
+RESTORE_STORAGE_SCRIPT = """
+var local = JSON.parse(arguments[0]), session = JSON.parse(arguments[1]);
+window.localStorage.clear(); window.sessionStorage.clear();
+local.forEach(function (item) { window.localStorage.setItem(item[0], item[1]); });
+session.forEach(function (item) { window.sessionStorage.setItem(item[0], item[1]); });
+"""
+
+class BrowserSnapshot:
+    """Cookies, localStorage/sessionStorage and URL of the current page"""
+    def __init__(self, url, cookies=(), local_storage="[]", session_storage="[]"):
+        self.url = url
+        self.cookies = list(cookies)
+        self.local_storage = local_storage
+        self.session_storage = session_storage
+
+    @classmethod
+    def take(cls, driver):
+        url = driver.current_url
+        if not url.startswith(('http:', 'https:')):
+            return cls(url)
+        storage = driver.execute_script(STORAGE_SCRIPT) or ["[]", "[]"]
+        return cls(url, driver.get_cookies(), *storage)
+
+    def restore(self, driver):
+        reset_driver(driver)
+        if not self.url.startswith(('http:', 'https:')):
+            return
+        # Cookies and storage can only be set for the page's own origin, so load it first
+        driver.get(self.url)
+        for cookie in self.cookies:
+            try:
+                driver.add_cookie(cookie)
+            except Exception:
+                pass  # Cookies of another domain (e.g. a login redirect) can't be set here
+        driver.execute_script(RESTORE_STORAGE_SCRIPT, self.local_storage, self.session_storage)
+        driver.get(self.url)
+
+class PrefixNode:
+    def __init__(self, chunk=()):
+        self.chunk = chunk
+        self.children = {}
+        self.cases = []
+
+def _step_key(step):
+    return step.command, step.line
+
+def chunks(plan):
+    """Split a plan after every step whose state a snapshot can capture.
+
+    Steps of SNAPSHOT_UNSAFE_COMMANDS (typed text, open alerts, frames...) leave
+    state that lives only in the page, so a branch can't start right after one:
+    they stay in a chunk with the steps that follow them.
+    """
+    chunk = []
+    for step in plan:
+        chunk.append(step)
+        if step.command not in SNAPSHOT_UNSAFE_COMMANDS:
+            yield tuple(chunk)
+            chunk = []
+    if chunk:
+        yield tuple(chunk)
+
+def build_trie(cases):
+    """Prefix trie of (name, plan) pairs over their chunks of steps"""
+    root = PrefixNode()
+    for name, plan in cases:
+        node = root
+        for chunk in chunks(plan):
+            key = tuple(_step_key(step) for step in chunk)
+            if key not in node.children:
+                node.children[key] = PrefixNode(chunk)
+            node = node.children[key]
+        node.cases.append(name)
+    return root
+
+def count_steps(root):
+    """(steps executed with sharing, steps of all cases run one by one)"""
+    executed = total = 0
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        executed += len(node.chunk)
+        depth += len(node.chunk)
+        total += depth * len(node.cases)
+        stack.extend((child, depth) for child in node.children.values())
+    return executed, total
+
+def run_shared(executor, cases):
+    """Run independent test cases, executing each shared prefix only once.
+
+    cases are (name, plan) pairs that each start from a clean browser. The
+    trie is walked depth first: the first branch below a shared prefix
+    continues on the live browser, the others restore the snapshot taken at
+    the branch point. Yields (name, [(step, StepResult), ...]) as each case
+    completes; steps of a shared prefix appear, with the same result, in
+    every case that shares it.
+    """
+    root = build_trie(cases)
+    executed, total = count_steps(root)
+    print(f"Shared prefixes: running {executed} of {total} steps")
+
+    reset_driver(executor.driver)
+    stack = [(root, [], executor.create_namespace(), None)]
+    while stack:
+        node, steps, namespace, snapshot = stack.pop()
+        if snapshot is not None:
+            executor.maybe_recycle()
+            snapshot.restore(executor.driver)
+            namespace = dict(namespace, driver=executor.waiter)
+        if node.chunk:
+            offset = len(steps)
+            steps = steps + list(executor.iter_plan(node.chunk, namespace))
+            for position, (_, result) in enumerate(steps[offset:], offset + 1):
+                result.index = position
+        for name in node.cases:
+            yield name, steps
+
+        children = list(node.children.values())
+        if len(children) > 1:
+            branch = BrowserSnapshot.take(executor.driver)
+            namespace_at_branch = dict(namespace)
+        for number, child in reversed(list(enumerate(children))):
+            if number == 0:
+                stack.append((child, steps, namespace, None))
+            else:
+                stack.append((child, steps, namespace_at_branch, branch))
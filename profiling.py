@@ -0,0 +1,131 @@
+import csv
+import json
+import time
+from functools import wraps
+from pathlib import Path
+
+# Upper bounds (seconds) of the per-command latency histogram buckets
+HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, float('inf'))
+
+FIELDS = ('index', 'command', 'line', 'outcome', 'wall_time', 'cpu_time',
+          'driver_time', 'lookups', 'wait_time')
+
+class StepResult:
+    """Outcome and timings of one executed step.
+
+    str() gives the classic "PASS" / "FAIL: ..." outcome so a StepResult can
+    be used wherever the plain result strings were.
+    """
+    def __init__(self, index, command, line, outcome, wall_time=0.0, cpu_time=0.0,
+                 driver_time=0.0, lookups=0, wait_time=0.0):
+        self.index = index
+        self.command = command
+        self.line = line
+        self.outcome = outcome
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.driver_time = driver_time
+        self.lookups = lookups
+        self.wait_time = wait_time
+
+    def __str__(self):
+        return self.outcome
+
+    def __repr__(self):
+        return f"StepResult({self.index}, {self.command!r}, {self.outcome!r}, wall_time={self.wall_time:.3f})"
+
+    @property
+    def passed(self):
+        return self.outcome == "PASS"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+class StepMetrics:
+    """Counters the driver proxy fills in while a step runs"""
+    def __init__(self):
+        self.reset()
+        self._depth = 0
+
+    def reset(self):
+        self.driver_time = 0.0
+        self.lookups = 0
+        self.wait_time = 0.0
+
+    def timed(self, func):
+        """Wrap a driver callable so its duration counts as driver time.
+
+        Only the outermost call is counted, so a proxied call that goes on to
+        use driver.execute is not counted twice.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if self._depth:
+                return func(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.driver_time += time.perf_counter() - start
+                self._depth -= 1
+        return wrapper
+
+class StepHook:
+    """Base class for code that observes step execution (profilers, exporters).
+
+    Register with TestExecutor(hooks=[...]) or executor.add_hook(hook) and
+    override either method.
+    """
+    def before_step(self, index, step):
+        pass
+
+    def after_step(self, index, step, result):
+        pass
+
+def export_json(step_results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([result.to_dict() for result in step_results], f, indent=2)
+
+def export_csv(step_results, path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for result in step_results:
+            writer.writerow(result.to_dict())
+
+def export_results(step_results, path):
+    """Write step results as JSON or CSV depending on the file extension"""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        export_csv(step_results, path)
+    elif path.suffix.lower() == '.json':
+        export_json(step_results, path)
+    else:
+        raise ValueError(f"Unsupported metrics format: {path.suffix} (use .json or .csv)")
+    return str(path)
+
+class LatencyHistogram:
+    """Per-command wall time histogram built incrementally"""
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.counts = {}
+        self.totals = {}
+
+    def add(self, command, seconds):
+        command = command or "(script line)"
+        counts = self.counts.setdefault(command, [0] * len(self.buckets))
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                counts[i] += 1
+                break
+        self.totals[command] = self.totals.get(command, 0.0) + seconds
+
+    @classmethod
+    def from_results(cls, step_results):
+        histogram = cls()
+        for result in step_results:
+            # Plain result strings (e.g. steps kept from a resumed run) carry no timing
+            if hasattr(result, 'wall_time'):
+                histogram.add(result.command, result.wall_time)
+        return histogram
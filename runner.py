@@ -0,0 +1,158 @@
+import glob
+import multiprocessing
+import queue
+from pathlib import Path
+from config.settings import SUITE_WORKERS, HISTORY_ENABLED
+from utils import load_translation_table, load_testcase, load_workbook_settings
+from compiler import compile_testcase
+from executor import TestExecutor, reset_driver
+from datadriven import data_references, expand_testcase, iter_dataset, resolve_dataset
+from history import ResultsHistory, order_workbooks
+
+def discover_workbooks(pattern):
+    """Expand a directory or glob pattern into a sorted list of test case workbooks"""
+    path = Path(pattern)
+    if path.is_dir():
+        paths = path.glob("*.xlsx")
+    elif path.is_file():
+        paths = [path]
+    else:
+        paths = (Path(p) for p in glob.glob(str(pattern), recursive=True))
+    # Skip Excel lock files like ~$test_cases.xlsx
+    workbooks = sorted(p for p in paths if not p.name.startswith("~$"))
+    if not workbooks:
+        raise FileNotFoundError(f"No test case workbooks match {pattern}")
+    return workbooks
+
+def run_workbook(executor, path, translation_table, history=None, data=None):
+    """Run one workbook on an existing executor and return its result record.
+
+    data overrides the workbook's dataset, as with main.py --data.
+    """
+    record = {'workbook': str(path), 'lines': [], 'results': [], 'commands': [], 'durations': [],
+              'error': None}
+    if history:
+        history.start_run(path)
+    try:
+        testcase_df = load_testcase(path)
+        if data_references(testcase_df):
+            rows = iter_dataset(*resolve_dataset(path, data))
+            expanded = (df for _, _, df in expand_testcase(testcase_df, rows))
+        else:
+            expanded = [testcase_df]
+        for number, df in enumerate(expanded):
+            if number:
+                reset_driver(executor.driver)  # Iterations must not share cookies and page state
+            plan = compile_testcase(df, translation_table)
+            for step, result in executor.iter_plan(plan):
+                record['lines'].append(step.line)
+                record['results'].append(result.outcome)
+                record['commands'].append(step.command)
+                record['durations'].append(result.wall_time)
+    except Exception as e:
+        record['error'] = str(e)
+    if history:
+        history.finish_run()
+    if executor.governor:
+        record['resources'] = executor.governor.take_report()
+    return record
+
+def driver_options(path, backend=None, browser=None, profile=None):
+    """Driver settings for a workbook: explicit arguments win over its Settings sheet"""
+    workbook_settings = load_workbook_settings(path)
+    return {
+        'backend': backend,
+        'browser': browser or workbook_settings.get('Browser') or None,
+        'profile': profile or workbook_settings.get('Profile') or None,
+    }
+
+def _worker_main(slot, options, tasks, results):
+    """Worker process loop: one long-lived driver, reset between workbooks"""
+    translation_table = load_translation_table()
+    history = ResultsHistory() if HISTORY_ENABLED else None
+    executor = None
+    current = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            index, path = task
+            try:
+                wanted = driver_options(path, **options)
+                if executor is None or wanted != current:
+                    # A workbook asking for another browser or profile gets its own driver
+                    if executor:
+                        executor.close()
+                    executor = None
+                    executor = TestExecutor(slot=slot, hooks=[history] if history else [], **wanted)
+                    current = wanted
+                else:
+                    # Workbook boundaries are the suite's case boundaries
+                    executor.maybe_recycle()
+            except Exception as e:
+                results.put((index, {'workbook': str(path), 'lines': [], 'results': [],
+                                     'error': f"Driver start failed: {e}"}))
+                continue
+
+            record = run_workbook(executor, path, translation_table, history)
+            try:
+                reset_driver(executor.driver)
+            except Exception as e:
+                # A driver that can't be reset is replaced rather than reused
+                record['error'] = record['error'] or f"Driver reset failed: {e}"
+                executor.close()
+                executor = None
+            results.put((index, record))
+    finally:
+        if history:
+            history.close()
+        if executor:
+            executor.close()
+
+def run_suite(workbooks, workers=None, backend=None, browser=None, profile=None, order=None):
+    """Run workbooks across worker processes, returning records in input order.
+
+    order ("failures" or "longest") dispatches workbooks by results history;
+    longest first keeps one long workbook from finishing the run alone.
+    """
+    workbooks = [str(p) for p in workbooks]
+    workers = max(1, min(workers or SUITE_WORKERS, len(workbooks)))
+
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    dispatch = order_workbooks(workbooks, order) if order else workbooks
+    for path in dispatch:
+        tasks.put((workbooks.index(path), path))
+    for _ in range(workers):
+        tasks.put(None)
+
+    options = {'backend': backend, 'browser': browser, 'profile': profile}
+    processes = [
+        multiprocessing.Process(target=_worker_main, args=(slot, options, tasks, results), daemon=True)
+        for slot in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    records = [None] * len(workbooks)
+    pending = len(workbooks)
+    while pending:
+        try:
+            index, record = results.get(timeout=1)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+            continue
+        records[index] = record
+        pending -= 1
+
+    for process in processes:
+        process.join(timeout=10)
+
+    # Workbooks whose worker died never report back
+    for index, record in enumerate(records):
+        if record is None:
+            records[index] = {'workbook': workbooks[index], 'lines': [], 'results': [],
+                              'error': "Worker exited before finishing this workbook"}
+    return records
@@ -1,20 +1,43 @@
-import pandas as pd
+import fnmatch
+import re
+import warnings
 from pathlib import Path
 from config.settings import TRANSLATION_TABLE_PATH, DEFAULT_TESTCASE_PATH
+from cache import cached_load
+from locators import apply_strategy, XPATH_PLACEHOLDER
 
-def load_translation_table(path=None):
+# pandas is imported inside the functions that need it, so importing this
+# module stays cheap for `python GUI.py`. Only the translation table (a plain
+# dict) comes back from the cache without pandas; a cached test case is a
+# DataFrame, and unpickling it imports pandas.
+
+def load_translation_table(path=None, cache=True):
+    """{command: template}; cache=False always parses the file (e.g. to time it)"""
     path = Path(path) if path else TRANSLATION_TABLE_PATH
     if not path.exists():
         raise FileNotFoundError(f"Translation table not found at {path}")
+    if not cache:
+        return _read_translation_table(path)
     
+    return cached_load(path, _read_translation_table, 'translation')
+
+def _read_translation_table(path):
+    import pandas as pd
     df = pd.read_excel(path)
     return dict(zip(df['Command'], df['Selenium Code']))
 
-def load_testcase(path=None):
+def load_testcase(path=None, cache=True):
+    """Test case dataframe with blanks as ''; cache=False always parses the file"""
     path = Path(path) if path else DEFAULT_TESTCASE_PATH
     if not path.exists():
         raise FileNotFoundError(f"Test case file not found at {path}")
+    if not cache:
+        return _read_testcase(path)
     
+    return cached_load(path, _read_testcase, 'testcase')
+
+def _read_testcase(path):
+    import pandas as pd
     df = pd.read_excel(path)
     required_columns = {'Step', 'Command'}
     if not required_columns.issubset(df.columns):
@@ -22,22 +45,190 @@ def load_testcase(path=None):
     
     return df.fillna('')
     
+def load_workbook_settings(path=None):
+    """Key/Value pairs of a workbook's optional "Settings" sheet (e.g. Profile, Browser)"""
+    path = Path(path) if path else DEFAULT_TESTCASE_PATH
+    return cached_load(path, _read_workbook_settings, 'settings')
+
+def _read_workbook_settings(path):
+    import pandas as pd
+    with pd.ExcelFile(path) as workbook:
+        if 'Settings' not in workbook.sheet_names:
+            return {}
+        df = workbook.parse('Settings').fillna('')
+    return {str(key).strip(): str(value).strip() for key, value in zip(df['Key'], df['Value']) if key}
+
+def split_test_cases(testcase_df, default_name):
+    """Split a test case dataframe into its setup steps and named test cases.
+
+    Workbooks with a TestCase column hold several cases: rows above the first
+    named case are a setup prefix shared by all of them, and blank cells
+    continue the case above. Without the column the whole workbook is one
+    case called default_name.
+    """
+    import pandas as pd
+    if 'TestCase' not in testcase_df.columns:
+        return testcase_df.iloc[0:0], [(default_name, testcase_df)]
+
+    names = testcase_df['TestCase'].astype(str).str.strip().replace('', pd.NA).ffill()
+    setup_df = testcase_df[names.isna()]
+    cases = [(name, testcase_df[names == name]) for name in names.dropna().unique()]
+    return setup_df, cases
+
+def _matches(name, patterns):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+def _case_tags(rows):
+    tags = set()
+    for row in rows:
+        tags.update(tag.strip() for tag in str(row.get('Tags', '')).split(',') if tag.strip())
+    return tags
+
+def iter_workbook_cases(path, sheets=None, names=None, tags=None):
+    """Stream the test cases of every test sheet in a workbook.
+
+    Yields (sheet, setup_df, name, case_df) as soon as each case has been read,
+    using openpyxl's read-only mode, so memory and time to the first case
+    depend on the size of a case rather than of the workbook. Sheets without
+    Step and Command columns (Settings, datasets) are skipped. sheets and
+    names are lists of fnmatch patterns, tags selects cases whose Tags column
+    (comma separated, on any of their rows) contains one of them. Cases are
+    split as in split_test_cases; without a TestCase column a sheet is one
+    case named after the sheet.
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Test case file not found at {path}")
+    tags = set(tags or ())
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.sheetnames:
+            if sheets and not _matches(sheet, sheets):
+                continue
+            rows = workbook[sheet].iter_rows(values_only=True)
+            header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+            if not {'Step', 'Command'}.issubset(header):
+                continue
+            columns = [column for column in header if column]
+
+            def make_df(records):
+                return pd.DataFrame(records, columns=columns)
+
+            def selected(name, records):
+                return ((not names or _matches(name, names)) and
+                        (not tags or tags & _case_tags(records)))
+
+            setup, name, records = [], None, []
+            if 'TestCase' not in header:
+                name = sheet
+            for values in rows:
+                if all(cell is None for cell in values):
+                    continue
+                # Read-only rows stop at their last non-empty cell
+                record = dict.fromkeys(columns, '')
+                record.update((key, cell) for key, cell in zip(header, values) if key and cell is not None)
+                row_name = str(record.get('TestCase', '')).strip()
+                if row_name and row_name != name:
+                    if name is not None and selected(name, records):
+                        yield sheet, make_df(setup), name, make_df(records)
+                    name, records = row_name, []
+                if name is None:
+                    setup.append(record)
+                else:
+                    records.append(record)
+            if name is not None and selected(name, records):
+                yield sheet, make_df(setup), name, make_df(records)
+    finally:
+        workbook.close()
+
+def step_command(row):
+    """A step's Command cell as the translation table spells it, i.e. without padding.
+
+    Every path that looks a command up (compiling, script generation,
+    validation) goes through this, so they agree on what a padded cell means.
+    """
+    return str(row.get('Command', '')).strip()
+
 def generate_code_from_testcase(testcase_df, translation_table):
     """Generate executable Python code from test case dataframe using translation table"""
     script_lines = []
     for _, row in testcase_df.iterrows():
-        command = row['Command']
+        command = step_command(row)
         template = translation_table.get(command, '')
         if not template:
             continue
             
-        line = template
-        if '{locator}' in template:
-            line = line.replace('{locator}', str(row.get('Locator', '')))
-        if '{value}' in template:
-            line = line.replace('{value}', str(row.get('Value', '')))
-        if '{url}' in template:
-            line = line.replace('{url}', str(row.get('Value', '')))
-            
-        script_lines.append(line)
-    return script_lines
\ No newline at end of file
+        script_lines.append(render_template(*apply_strategy(template, row.get('Locator', ''), row.get('Value', ''))))
+    return script_lines
+
+def render_template(template, locator='', value=''):
+    """Fill the placeholders of a translation table template with step values"""
+    line = template
+    if '{locator}' in template:
+        line = line.replace('{locator}', str(locator))
+    if '{value}' in template:
+        line = line.replace('{value}', str(value))
+    if '{url}' in template:
+        line = line.replace('{url}', str(value))
+    return line
+
+PLACEHOLDER_PATTERN = re.compile(r'\{(locator|value|url)\}')
+PLACEHOLDER_COLUMNS = {'locator': 'Locator', 'value': 'Value', 'url': 'Value'}
+
+def parse_template(template):
+    """Split a template into its literal segments and the columns filling the gaps between them"""
+    parts = PLACEHOLDER_PATTERN.split(template)
+    return parts[0::2], [PLACEHOLDER_COLUMNS[name] for name in parts[1::2]]
+
+def generate_code_vectorized(testcase_df, translation_table, strict=True):
+    """Column-wise equivalent of generate_code_from_testcase for large workbooks.
+
+    Each template is parsed once and filled for all rows using it with pandas
+    string concatenation. Unknown commands are reported together: a ValueError
+    when strict, otherwise a warning, and their rows are skipped either way.
+    """
+    import pandas as pd
+    df = testcase_df.reset_index(drop=True)
+    commands = df['Command'].astype(str).str.strip()  # As step_command does
+    columns = {
+        column: df[column].astype(str) if column in df.columns else pd.Series('', index=df.index)
+        for column in set(PLACEHOLDER_COLUMNS.values())
+    }
+
+    known = commands.map(lambda command: bool(translation_table.get(command))).astype(bool)
+    unknown = ~known & (commands != '')
+    if unknown.any():
+        steps = df['Step'] if 'Step' in df.columns else df.index.to_series() + 1
+        found = steps[unknown].groupby(commands[unknown], sort=False).agg(list)
+        message = "Unknown commands: " + ", ".join(
+            f"{command} (steps {', '.join(str(step) for step in step_list)})"
+            for command, step_list in found.items())
+        if strict:
+            raise ValueError(message)
+        warnings.warn(message)
+
+    lines = pd.Series('', index=df.index, dtype=object)
+    for command in commands[known].unique():
+        mask = commands == command
+        template = translation_table[command]
+        if not XPATH_PLACEHOLDER.search(template):
+            lines[mask] = _fill_template(template, columns, df.index[mask])
+            continue
+        # Locator prefixes pick the By strategy per row: fill each resulting template separately
+        resolved = pd.DataFrame([apply_strategy(template, locator, value) for locator, value
+                                 in zip(columns['Locator'][mask], columns['Value'][mask])],
+                                index=df.index[mask], columns=['Template', 'Locator', 'Value'])
+        for variant, rows in resolved.groupby('Template', sort=False):
+            lines[rows.index] = _fill_template(variant, rows, rows.index)
+    return lines[known].tolist()
+
+def _fill_template(template, columns, index):
+    import pandas as pd
+    literals, sources = parse_template(template)
+    filled = pd.Series(literals[0], index=index, dtype=object)
+    for column, literal in zip(sources, literals[1:]):
+        filled = filled + columns[column][index] + literal
+    return filled
@@ -0,0 +1,239 @@
+import argparse
+import json
+import multiprocessing
+import re
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from utils import load_translation_table, load_testcase, render_template, iter_workbook_cases, step_command
+from compiler import compile_template, _parse
+from datadriven import DATA_REFERENCE
+from locators import apply_strategy
+
+try:
+    from lxml import etree
+except ImportError:  # In requirements.txt; without it XPaths only get a bracket and token check,
+    etree = None       # which lets malformed predicates through to the browser
+
+_worker_table = None  # Translation table of a validate_workbooks worker process
+
+XPATH_AXES = {
+    'ancestor', 'ancestor-or-self', 'attribute', 'child', 'descendant', 'descendant-or-self',
+    'following', 'following-sibling', 'namespace', 'parent', 'preceding', 'preceding-sibling', 'self',
+}
+XPATH_TOKEN = re.compile(r"""
+    (?P<string>"[^"]*"|'[^']*')
+  | (?P<unterminated>["'])
+  | (?P<axis>[A-Za-z][\w.-]*)\s*::
+  | (?P<open>[(\[])
+  | (?P<close>[)\]])
+  | (?P<other>\s+|//?|\.\.?|@|\*|,|\||=|!=|<=|>=|<|>|\+|-|\$|[\w.:-]+|\d+(?:\.\d*)?)
+  | (?P<invalid>.)
+""", re.VERBOSE)
+
+@lru_cache(maxsize=8192)
+def xpath_error(xpath):
+    """Why an XPath expression can't be evaluated, or None if it compiles"""
+    if not xpath.strip():
+        return "empty XPath"
+    if etree is not None:
+        try:
+            etree.XPath(xpath)
+        except etree.XPathSyntaxError as e:
+            return f"invalid XPath: {e}"
+        return None
+
+    stack = []
+    previous = None
+    for match in XPATH_TOKEN.finditer(xpath):
+        kind, text = match.lastgroup, match.group()
+        if kind == 'unterminated':
+            return "invalid XPath: unterminated string"
+        if kind == 'invalid':
+            return f"invalid XPath: unexpected character {text!r}"
+        if kind == 'axis' and match.group('axis') not in XPATH_AXES:
+            return f"invalid XPath: unknown axis {match.group('axis')}"
+        if kind == 'open':
+            stack.append(text)
+        elif kind == 'close':
+            if not stack or {'(': ')', '[': ']'}[stack.pop()] != text:
+                return "invalid XPath: unbalanced brackets"
+            if text == ']' and previous == '[':
+                return "invalid XPath: empty predicate"
+        if not text.isspace():
+            previous = text
+    if stack:
+        return "invalid XPath: unbalanced brackets"
+    if previous in ('/', '//', '@', '|', '=', ',') and xpath.strip() != '/':
+        return f"invalid XPath: ends with {previous!r}"
+    return None
+
+@lru_cache(maxsize=1024)
+def template_info(command, template):
+    """(placeholders, uses_xpath, parameterized) of a translation table template"""
+    placeholders = frozenset(re.findall(r'\{(locator|value|url)\}', template))
+    uses_xpath = bool(re.search(r'By\.XPATH,\s*["\']\{locator\}', template))
+    try:
+        parameterized = compile_template(command, template) is not None
+    except SyntaxError:
+        parameterized = False
+    return placeholders, uses_xpath, parameterized
+
+def _issue(issues, severity, code, message, row, step, command):
+    issues.append({'severity': severity, 'code': code, 'message': message,
+                   'row': row, 'step': step, 'command': command})
+
+def _blank(cell):
+    return str(cell).strip() == ''
+
+def _is_number(text):
+    try:
+        return float(text) >= 0
+    except ValueError:
+        return False
+
+def validate_testcase(testcase_df, translation_table):
+    """Check a test case without a browser and return a list of issue dicts.
+
+    Errors are steps that can't run as written: unknown commands, empty
+    Locator/Value cells a template needs, XPaths that don't compile, values
+    that break the generated Python and non-numeric values where the template
+    expects a number (Wait). Warnings are lines that run (values are bound as
+    variables) but can't be exported as a script.
+    """
+    issues = []
+    columns = set(testcase_df.columns)
+    for number, row in enumerate(testcase_df.to_dict('records')):
+        excel_row = number + 2  # Header is row 1
+        command = step_command(row)
+        step = row.get('Step', '')
+        step = step if step != '' else None
+        if not command:
+            continue
+        template = translation_table.get(command)
+        if not template:
+            _issue(issues, 'error', 'unknown-command', f"Unknown command: {command}", excel_row, step, command)
+            continue
+
+        template, locator, value = apply_strategy(template, row.get('Locator', ''), row.get('Value', ''))
+        placeholders, uses_xpath, parameterized = template_info(command, template)
+        if 'locator' in placeholders and ('Locator' not in columns or _blank(locator)):
+            _issue(issues, 'error', 'missing-locator', f"{command} needs a Locator", excel_row, step, command)
+        if placeholders & {'value', 'url'} and ('Value' not in columns or _blank(value)):
+            _issue(issues, 'error', 'missing-value', f"{command} needs a Value", excel_row, step, command)
+
+        # Dataset references are only known once expanded
+        locator_text = str(locator)
+        if uses_xpath and not _blank(locator) and not DATA_REFERENCE.search(locator_text):
+            error = xpath_error(locator_text)
+            if error:
+                _issue(issues, 'error', 'invalid-xpath', f"{error}: {locator_text}", excel_row, step, command)
+
+        value_text = str(value).strip()
+        if (re.search(r'(?<!["\'])\{value\}(?!["\'])', template) and not _blank(value)
+                and not DATA_REFERENCE.search(value_text) and not _is_number(value_text)):
+            _issue(issues, 'error', 'not-a-number', f"{command} value must be a number, got {value_text!r}",
+                   excel_row, step, command)
+            continue
+
+        try:
+            _parse(render_template(template, locator, value))
+        except SyntaxError as e:
+            if parameterized:
+                _issue(issues, 'warning', 'unexportable-line',
+                       f"Value breaks the generated line when exported: {e.msg}", excel_row, step, command)
+            else:
+                _issue(issues, 'error', 'invalid-python',
+                       f"Generated line is not valid Python: {e.msg}", excel_row, step, command)
+    return issues
+
+def validate_workbook(path, translation_table=None, sheets=None):
+    """Issues of one workbook: its first sheet, or the matching test sheets when sheets is given"""
+    translation_table = translation_table or load_translation_table()
+    issues = []
+    try:
+        if sheets:
+            checked = set()
+            for sheet, setup_df, name, df in iter_workbook_cases(path, sheets):
+                # Streamed cases carry no sheet row numbers, so issues name the case instead
+                parts = (df,) if sheet in checked else (setup_df, df)
+                checked.add(sheet)
+                for part in parts:
+                    for issue in validate_testcase(part, translation_table):
+                        issue.update(sheet=sheet, case=name, row=None)
+                        issues.append(issue)
+        else:
+            issues = validate_testcase(load_testcase(path), translation_table)
+    except Exception as e:
+        issues.append({'severity': 'error', 'code': 'unreadable', 'message': str(e),
+                       'row': None, 'step': None, 'command': None})
+    for issue in issues:
+        issue['workbook'] = str(path)
+    return issues
+
+def _validate_task(task):
+    path, sheets = task
+    return validate_workbook(path, _worker_table, sheets)
+
+def _init_worker(translation_table):
+    global _worker_table
+    _worker_table = translation_table
+
+def validate_workbooks(paths, sheets=None, jobs=1):
+    """Validate many workbooks, in worker processes when jobs > 1, and summarise as a dict"""
+    start = time.perf_counter()
+    translation_table = load_translation_table()
+    paths = [str(p) for p in paths]
+    if jobs > 1 and len(paths) > 1:
+        with multiprocessing.Pool(jobs, _init_worker, (translation_table,)) as pool:
+            per_workbook = pool.map(_validate_task, [(p, sheets) for p in paths], chunksize=16)
+    else:
+        per_workbook = [validate_workbook(p, translation_table, sheets) for p in paths]
+
+    issues = [issue for workbook_issues in per_workbook for issue in workbook_issues]
+    errors = sum(issue['severity'] == 'error' for issue in issues)
+    return {
+        'workbooks': len(paths),
+        'failed_workbooks': sorted({i['workbook'] for i in issues if i['severity'] == 'error'}),
+        'errors': errors,
+        'warnings': len(issues) - errors,
+        'seconds': round(time.perf_counter() - start, 3),
+        'issues': issues,
+    }
+
+def format_issues(issues):
+    """Human readable lines for a list of issues"""
+    lines = []
+    for issue in issues:
+        where = f" [{issue['sheet']}: {issue['case']}]" if issue.get('sheet') else ""
+        where += f" row {issue['row']}" if issue['row'] else f" step {issue['step']}"
+        lines.append(f"{Path(issue['workbook']).name}{where}: {issue['severity']}: {issue['message']}")
+    return lines
+
+def main(argv=None):
+    from runner import discover_workbooks
+
+    parser = argparse.ArgumentParser(description="Check test case workbooks without starting a browser")
+    parser.add_argument("patterns", nargs="+", help="workbooks, directories or glob patterns")
+    parser.add_argument("--sheet", action="append", dest="sheets", metavar="NAME",
+                        help="check these test sheets instead of the first one ('*' for all)")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes")
+    parser.add_argument("--output", metavar="PATH", help="write the JSON report here instead of stdout")
+    parser.add_argument("--strict", action="store_true", help="fail on warnings too")
+    args = parser.parse_args(argv)
+
+    paths = [path for pattern in args.patterns for path in discover_workbooks(pattern)]
+    report = validate_workbooks(paths, args.sheets, args.jobs)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print("\n".join(format_issues(report['issues'])), file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    failed = report['errors'] or (args.strict and report['warnings'])
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
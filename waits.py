@@ -0,0 +1,209 @@
+import json
+import time
+from pathlib import Path
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from config.settings import (IMPLICIT_WAIT, POLL_INTERVAL, COMMAND_TIMEOUTS, ADAPTIVE_WAITS,
+                             WAIT_STATS_PATH, MIN_WAIT_SAMPLES, MIN_TIMEOUT, ELEMENT_CACHE)
+from cache import write_atomic
+from profiling import StepMetrics
+
+# Driver methods after which previously found elements can't be reused
+NAVIGATION_METHODS = {'get', 'back', 'forward', 'refresh', 'close'}
+FRAME_METHODS = {'frame', 'default_content', 'parent_frame', 'window', 'new_window'}
+
+BATCH_LOOKUP_SCRIPT = """
+return arguments[0].map(function (locator) {
+    var by = locator[0], value = locator[1];
+    if (by === 'xpath') {
+        return document.evaluate(value, document, null,
+                                 XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    if (by === 'id') return document.getElementById(value);
+    if (by === 'name') return document.getElementsByName(value)[0] || null;
+    return document.querySelector(value);
+});
+"""
+
+class LatencyStats:
+    """Observed locator readiness latencies, persisted across runs.
+
+    Parallel workers share the file, so save() merges the samples recorded
+    since the last save into what is on disk and replaces it atomically.
+    """
+    MAX_SAMPLES = 50
+    MAX_LOCATORS = 10000  # least recently seen locators are forgotten first
+    SAVE_INTERVAL = 30  # seconds between saves during a run
+
+    def __init__(self, path=None):
+        self.path = path or WAIT_STATS_PATH
+        self.samples = {}
+        self.pending = {}  # Samples recorded since the last save
+        self.saved_at = time.monotonic()
+
+    @classmethod
+    def load(cls, path=None):
+        stats = cls(path)
+        stats.samples = stats._read()
+        return stats
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}  # First run or unreadable file: start without history
+
+    def save(self):
+        if not self.pending:
+            return
+        samples = self._read()
+        for locator, latencies in self.pending.items():
+            self._add(samples, locator, latencies)
+        write_atomic(Path(self.path), json.dumps(samples).encode('utf-8'))
+        self.samples = samples
+        self.pending = {}
+        self.saved_at = time.monotonic()
+
+    def save_if_due(self):
+        """Save unless the last save was recent, so short plans don't rewrite the file each time"""
+        if time.monotonic() - self.saved_at >= self.SAVE_INTERVAL:
+            self.save()
+
+    def record(self, locator, latency):
+        latency = round(latency, 3)
+        self._add(self.samples, locator, [latency])
+        self.pending.setdefault(locator, []).append(latency)
+
+    def _add(self, samples, locator, latencies):
+        # Re-inserting keeps the dict ordered from least to most recently seen
+        kept = samples.pop(locator, [])
+        samples[locator] = kept
+        kept.extend(latencies)
+        del kept[:-self.MAX_SAMPLES]
+        while len(samples) > self.MAX_LOCATORS:
+            del samples[next(iter(samples))]
+
+    def suggest(self, locator):
+        """Learned timeout for a locator, or None until enough samples exist"""
+        samples = self.samples.get(locator, [])
+        if len(samples) < MIN_WAIT_SAMPLES:
+            return None
+        return max(MIN_TIMEOUT, max(samples) * 2 + 1)
+
+class WaitPolicy:
+    """Per-command timeouts, optionally tightened by learned per-locator timeouts"""
+    def __init__(self, command_timeouts=None, default_timeout=None, poll_interval=None, stats=None):
+        self.command_timeouts = COMMAND_TIMEOUTS if command_timeouts is None else command_timeouts
+        self.default_timeout = IMPLICIT_WAIT if default_timeout is None else default_timeout
+        self.poll_interval = poll_interval or POLL_INTERVAL
+        self.stats = stats
+
+    def timeout_for(self, command, locator):
+        timeout = self.command_timeouts.get(command, self.default_timeout)
+        learned = self.stats.suggest(locator) if self.stats else None
+        if learned is not None:
+            timeout = min(timeout, learned)
+        return timeout
+
+class _SwitchToProxy:
+    """driver.switch_to that drops cached elements when the browsing context changes"""
+    def __init__(self, switch_to, owner):
+        self._switch_to = switch_to
+        self._owner = owner
+
+    def __getattr__(self, name):
+        attr = getattr(self._switch_to, name)
+        if name in FRAME_METHODS:
+            self._owner.invalidate()
+        return attr
+
+class WaitingDriver:
+    """Driver proxy whose find_element polls with an explicit WebDriverWait.
+
+    Everything else is delegated to the wrapped driver, so templates keep
+    using driver.find_element(By.XPATH, ...) unchanged. Without a policy
+    lookups go straight to the driver. Calls, lookups and time spent waiting
+    are counted in metrics.
+
+    Found elements are cached by locator until the page or frame changes
+    or a state-changing step ran (see invalidate), so consecutive read-only
+    steps on one element share a round trip. A lookup with a floor left by
+    a replaced sleep always goes to the page.
+    """
+    def __init__(self, driver, policy, metrics=None, use_cache=None):
+        self._driver = driver
+        self.policy = policy
+        self.metrics = metrics or StepMetrics()
+        self.use_cache = ELEMENT_CACHE if use_cache is None else use_cache
+        self.element_cache = {}
+        self._command = None
+        self._min_timeout = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._driver, name)
+        if name == 'switch_to':
+            return _SwitchToProxy(attr, self)
+        if name in NAVIGATION_METHODS:
+            self.invalidate()
+        return self.metrics.timed(attr) if callable(attr) else attr
+
+    def invalidate(self):
+        """Forget cached elements (navigation, frame switches, stale references)"""
+        self.element_cache.clear()
+
+    def prefetch_locators(self, locators):
+        """Resolve several (by, value) locators in one script round trip and cache the hits"""
+        locators = [locator for locator in dict.fromkeys(locators) if locator not in self.element_cache]
+        if not self.use_cache or not locators:
+            return
+        self.metrics.lookups += 1
+        try:
+            elements = self.metrics.timed(self._driver.execute_script)(BATCH_LOOKUP_SCRIPT,
+                                                                       [list(locator) for locator in locators])
+        except Exception:
+            return  # Individual lookups will still find (or wait for) the elements
+        for locator, element in zip(locators, elements or []):
+            if element is not None:
+                self.element_cache[locator] = element
+
+    def begin_step(self, command, min_timeout=0):
+        """Set the command whose timeout applies and a floor left by a replaced sleep"""
+        self._command = command
+        self._min_timeout = min_timeout
+
+    def find_element(self, by, value=None):
+        # After a replaced Wait the page is expected to change, so a cached element can't stand in
+        if self.use_cache and not self._min_timeout and (by, value) in self.element_cache:
+            return self.element_cache[(by, value)]
+        element = self._find_element(by, value)
+        if self.use_cache:
+            self.element_cache[(by, value)] = element
+        return element
+
+    def _find_element(self, by, value):
+        self.metrics.lookups += 1
+        find_element = self.metrics.timed(self._driver.find_element)
+        if self.policy is None:
+            return find_element(by, value)
+
+        timeout = max(self.policy.timeout_for(self._command, value), self._min_timeout)
+        start = time.monotonic()
+        try:
+            element = WebDriverWait(self._driver, timeout, poll_frequency=self.policy.poll_interval).until(
+                lambda driver: find_element(by, value))
+        except TimeoutException:
+            raise NoSuchElementException(f"Unable to locate element {value} within {timeout}s")
+        finally:
+            self.metrics.wait_time += time.monotonic() - start
+        if self.policy.stats is not None:
+            self.policy.stats.record(value, time.monotonic() - start)
+        return element
+
+    def find_elements(self, by, value=None):
+        self.metrics.lookups += 1
+        return self.metrics.timed(self._driver.find_elements)(by, value)
+
+def load_policy():
+    """Wait policy from settings, with the latency history when ADAPTIVE_WAITS is on"""
+    return WaitPolicy(stats=LatencyStats.load() if ADAPTIVE_WAITS else None)